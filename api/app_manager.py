@@ -33,8 +33,8 @@ class StandaloneApplication(gunicorn.app.base.BaseApplication):
     def load(self) -> Any:
         return self.application
 
-def run_slack_process(config: dict):
-    """Run Slack app in a separate process using configuration"""
+def run_slack_process(config: dict, worker_index: int = 0, worker_count: int = 1):
+    """Run one socket-mode Slack worker in a separate process using configuration"""
     from config.container import Container
 
     logger = logging.getLogger(__name__)
@@ -47,12 +47,28 @@ def run_slack_process(config: dict):
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
 
+    def report_warm_up(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Workspace directory warm-up failed: {task.exception()}")
+
     async def run_slack():
         container = Container()
-        container.config.override(config)
+        container.config.override({**config, "slack_worker_index": worker_index, "slack_worker_count": worker_count})
         slack_app = container.slack_app()
         await slack_app.setup_commands_and_events()
+        heartbeat = asyncio.create_task(container.slack_worker_registry().run_heartbeat())
+        metrics_reporter = asyncio.create_task(container.cache_metrics_reporter().run())
+        regroup_stats_publisher = asyncio.create_task(container.regroup_scheduler().run_publisher())
+        try:
+            await container.regroup_scheduler().rearm_seal_timers(container.channel_event_queue().owns)
+        except Exception as e:
+            logger.error(f"Can't re-arm seal timers of open tail groups (worker {worker_index}): {e}")
+        if worker_index == 0 and config.get('slack_directory_warmup_on_start', True):
+            # One worker is enough, the cache is shared through Redis
+            warm_up = asyncio.create_task(container.workspace_directory_warmer().warm_up())
+            warm_up.add_done_callback(report_warm_up)
 
+        # Every worker opens its own socket-mode connection, Slack spreads events across them
         handler = AsyncSocketModeHandler(
             app=slack_app.app,
             app_token=slack_app.slack_app_token
@@ -61,8 +77,14 @@ def run_slack_process(config: dict):
         try:
             await handler.start_async()
         except Exception as e:
-            logger.error(f"Error in Slack connection: {e}")
+            logger.error(f"Error in Slack connection (worker {worker_index}): {e}")
         finally:
+            heartbeat.cancel()
+            metrics_reporter.cancel()
+            regroup_stats_publisher.cancel()
+            await container.channel_event_queue().stop()
+            await container.redis_pool().disconnect()
+            await container.weaviate_connection_manager().close()
             if running:
                 await handler.close_async()
 
@@ -80,7 +102,7 @@ class AppManager:
         self.n8n_manager = n8n_manager
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self._slack_process = None
+        self._slack_processes: list[multiprocessing.Process] = []
         self.container = None
 
         @asynccontextmanager
@@ -100,6 +122,10 @@ class AppManager:
             except Exception as e:
                 self.logger.error(f"Error during startup: {e}")
                 raise
+            finally:
+                if self.container is not None:
+                    await self.container.redis_pool().disconnect()
+                    await self.container.weaviate_connection_manager().close()
 
         self.fastapi_app = FastAPI(lifespan=lifespan)
         from api.endpoints import router
@@ -108,14 +134,17 @@ class AppManager:
     def run_slack_and_api(self, host: str = "0.0.0.0", port: int = 8000) -> None:
         """Run both Slack and FastAPI server using gunicorn"""
         try:
-            # Start Slack process with injected container
-            self._slack_process = multiprocessing.Process(
-                target=run_slack_process,
-                args=(self.config,),
-                name="slack-websocket"
-            )
-            self._slack_process.start()
-            self.logger.info("Slack process started")
+            # Start Slack worker processes, channels are sharded between them
+            worker_count = max(1, self.config.get('slack_worker_count', 1))
+            for worker_index in range(worker_count):
+                process = multiprocessing.Process(
+                    target=run_slack_process,
+                    args=(self.config, worker_index, worker_count),
+                    name=f"slack-websocket-{worker_index}"
+                )
+                process.start()
+                self._slack_processes.append(process)
+            self.logger.info(f"Started {worker_count} Slack worker processes")
 
             workers = multiprocessing.cpu_count() * 2 + 1
             self.logger.info(f"Starting server on {host}:{port} with {workers} workers")
@@ -151,9 +180,12 @@ class AppManager:
             raise
 
     def kill_slack(self):
-        # Cleanup Slack process on API server shutdown
-        if self._slack_process and self._slack_process.is_alive():
-            self._slack_process.terminate()
-            self._slack_process.join(timeout=5)
-            if self._slack_process.is_alive():
-                self._slack_process.kill()
\ No newline at end of file
+        # Cleanup Slack processes on API server shutdown
+        for process in self._slack_processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._slack_processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self._slack_processes = []
\ No newline at end of file
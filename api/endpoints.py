@@ -256,3 +256,37 @@ async def send_slack_message(request: SlackMessageRequest):
   #  except Exception as e:
   #      raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
+
+@router.get("/event-queue/stats")
+async def event_queue_stats(request: Request):
+    """Depth and lag of the per-channel Slack event queues."""
+    container = request.state.container
+    return await container.channel_event_queue().get_stats()
+
+
+@router.get("/event-dedup/stats")
+async def event_dedup_stats(request: Request):
+    """How many Slack events were dropped as redeliveries."""
+    container = request.state.container
+    return await container.event_deduplicator().get_stats()
+
+
+@router.get("/regroup/stats")
+async def regroup_stats(request: Request):
+    """Grouping triggers, runs and triggers absorbed by debouncing, merged over Slack processes."""
+    container = request.state.container
+    return await container.regroup_scheduler().get_report()
+
+
+@router.get("/slack-workers")
+async def slack_workers(request: Request):
+    """Health of socket-mode worker processes and which worker owns which channel."""
+    container = request.state.container
+    return await container.slack_worker_registry().get_status()
+
+
+@router.get("/cache/metrics")
+async def cache_metrics(request: Request):
+    """Hit rates and Redis / Slack fetch latencies of SlackMetaInfo caches, merged over all processes."""
+    container = request.state.container
+    return await container.cache_metrics_reporter().get_report()
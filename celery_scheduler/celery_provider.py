@@ -12,7 +12,10 @@ class CeleryProvider(providers.Factory):
             main=celery_main,
             broker=f"redis://:{config['redis_password']}@{config['redis_host']}:{config['redis_port']}/{config['redis_celery_broker_db_num']}",
             backend=f"redis://:{config['redis_password']}@{config['redis_host']}:{config['redis_port']}/{config['redis_celery_backend_db_num']}",
-            include=['celery_scheduler.tasks.ping_manager_when_unanswered']
+            include=[
+                'celery_scheduler.tasks.ping_manager_when_unanswered',
+                'celery_scheduler.tasks.warm_up_workspace_directory',
+            ]
         )
         # Set additional configuration directly
         celery_app.conf.update(
@@ -22,6 +25,15 @@ class CeleryProvider(providers.Factory):
             timezone='UTC',
             enable_utc=True,
         )
+        warmup_interval = config.get('slack_directory_warmup_interval_seconds')
+        if warmup_interval:
+            # Refresh profiles and channel names before they expire from the cache
+            celery_app.conf.beat_schedule = {
+                'warm-up-workspace-directory': {
+                    'task': 'celery_scheduler.tasks.warm_up_workspace_directory',
+                    'schedule': warmup_interval,
+                },
+            }
         return celery_app  # Return the configured Celery instance
 
     def __call__(self) -> Celery:
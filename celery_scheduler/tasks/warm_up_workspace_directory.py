@@ -0,0 +1,19 @@
+from celery import shared_task
+import logging
+
+from asgiref.sync import async_to_sync
+from config.container import Container
+
+logger = logging.getLogger(__name__)
+
+@shared_task(name='celery_scheduler.tasks.warm_up_workspace_directory')
+def warm_up_workspace_directory_sync():
+    return async_to_sync(warm_up_workspace_directory)()
+
+async def warm_up_workspace_directory():
+    container = Container()
+    try:
+        return await container.workspace_directory_warmer().warm_up()
+    finally:
+        # Every task runs on its own event loop, pooled connections can't be reused by the next one
+        await container.redis_pool().disconnect()
@@ -60,6 +60,9 @@ class ConfigManager:
             "weaviate_secure": self.env.bool("WEAVIATE_SECURE", False),
             "weaviate_grpc_port": self.env.int("WEAVIATE_GRPC_PORT", 50051),
             "weaviate_api_key": self.env.str("WEAVIATE_API_KEY", None),
+            "weaviate_insert_max_batch_size": self.env.int("WEAVIATE_INSERT_MAX_BATCH_SIZE", 500),
+            "weaviate_insert_target_latency_seconds": self.env.float("WEAVIATE_INSERT_TARGET_LATENCY_SECONDS", 1.0),
+            "weaviate_insert_max_in_flight": self.env.int("WEAVIATE_INSERT_MAX_IN_FLIGHT", 4),
 
 
             "gpt_api_token": self.env.str("GPT_API_TOKEN", None),
@@ -68,6 +71,22 @@ class ConfigManager:
             "slack_app_token": self.env.str("SLACK_APP_TOKEN", None),
             "admin_user_ids": self.env.list("ADMIN_USER_IDS", []),  # Automatically parses as list
             "test_channel_id": self.env.str("TEST_CHANNEL_ID", None),
+            "slack_meta_local_cache_size": self.env.int("SLACK_META_LOCAL_CACHE_SIZE", 10_000),
+            "cache_metrics_interval_seconds": self.env.int("CACHE_METRICS_INTERVAL_SECONDS", 60),
+            "slack_thread_fetch_concurrency": self.env.int("SLACK_THREAD_FETCH_CONCURRENCY", 8),
+            "slack_thread_fetch_rate_per_minute": self.env.int("SLACK_THREAD_FETCH_RATE_PER_MINUTE", 50),
+            "slack_delete_rate_per_minute": self.env.int("SLACK_DELETE_RATE_PER_MINUTE", 50),
+            "slack_delete_concurrency": self.env.int("SLACK_DELETE_CONCURRENCY", 5),
+            "history_ingestion_queue_size": self.env.int("HISTORY_INGESTION_QUEUE_SIZE", 2),
+            "slack_worker_count": self.env.int("SLACK_WORKER_COUNT", 1),
+            "slack_worker_index": 0,  # Set per socket-mode process by AppManager
+            "event_queue_max_concurrent_channels": self.env.int("EVENT_QUEUE_MAX_CONCURRENT_CHANNELS", 8),
+            "event_dedup_ttl_seconds": self.env.int("EVENT_DEDUP_TTL_SECONDS", 60 * 60),
+            "regroup_debounce_seconds": self.env.float("REGROUP_DEBOUNCE_SECONDS", 5.0),
+            "tail_group_seal_after_seconds": self.env.float("TAIL_GROUP_SEAL_AFTER_SECONDS", 15 * 60),
+            "slack_directory_warmup_on_start": self.env.bool("SLACK_DIRECTORY_WARMUP_ON_START", True),
+            "slack_directory_warmup_interval_seconds": self.env.int("SLACK_DIRECTORY_WARMUP_INTERVAL_SECONDS", 24 * 60 * 60),
+            "history_archive_dir": self.env.str("HISTORY_ARCHIVE_DIR", str(Path(__file__).parent.parent / 'files/history')),
 
 
              # N8N Configuration
@@ -1,5 +1,6 @@
 from dependency_injector import containers, providers
 import redis
+import redis.asyncio
 import weaviate
 from jinja2 import Environment, BaseLoader
 from langchain_openai import ChatOpenAI
@@ -11,12 +12,26 @@ from config.config_manager import ConfigManager
 from llm.llm_caller import LLMCaller, SatisfactionLevel
 from n8n.n8n_provider import N8nProvider
 from n8n.n8n_workflow_manager import N8nWorkflowManager
+from slack.bulk_message_deleter import BulkMessageDeleter
+from slack.cache_invalidation_bus import CacheInvalidationBus
+from slack.channel_event_queue import ChannelEventQueue
+from slack.channel_sync_state import ChannelSyncStateStore
+from slack.event_deduplicator import EventDeduplicator
+from slack.history_archive import HistoryArchive
+from slack.history_ingestion_pipeline import HistoryIngestionPipeline
 from slack.message_history_fetcher import MessageHistoryFetcher
 from slack.role_assignment import RoleAssignment
 from slack.slack_message_handler import SlackMessageHandler
 from slack.slack_meta_info import SlackMetaInfo
 from slack.slack_utilities import SlackUtilities
+from slack.slack_worker_registry import SlackWorkerRegistry
+from slack.workspace_directory_warmer import WorkspaceDirectoryWarmer
+from utils.cache_metrics import CacheMetrics, CacheMetricsReporter
+from vectordb.batch_inserter import AdaptiveBatchInserter
+from vectordb.incremental_grouper import IncrementalGrouper
+from vectordb.regroup_scheduler import RegroupScheduler
 from vectordb.vector_db_helper import VectorDBHelper
+from vectordb.weaviate_connection_manager import WeaviateConnectionManager
 from workflows.channel_state_manager import ChannelStateManager
 from workflows.slack_state_manager import SlackStateManager
 from weaviate.auth import AuthApiKey
@@ -36,13 +51,28 @@ class Container(containers.DeclarativeContainer):
         config=config
     )
 
-    redis_client = providers.Singleton(
+    # Blocking client, only for the cache invalidation listener thread, which runs off any event loop.
+    # Celery tasks drive the same async components on a per-task loop, so they use redis_client as well
+    # and disconnect redis_pool when the task ends.
+    sync_redis_client = providers.Singleton(
         redis.Redis,
         host=config.redis_host,
         port=config.redis_port,
         db=config.redis_app_db_num,
         password=config.redis_password
     )
+    redis_pool = providers.Singleton(
+        redis.asyncio.ConnectionPool,
+        host=config.redis_host,
+        port=config.redis_port,
+        db=config.redis_app_db_num,
+        password=config.redis_password
+    )
+    # Used by everything running on an event loop, all components share one connection pool
+    redis_client = providers.Singleton(
+        redis.asyncio.Redis,
+        connection_pool=redis_pool
+    )
     weaviate_client = providers.Singleton(
         weaviate.use_async_with_custom,
         http_host=config.weaviate_host,
@@ -63,9 +93,36 @@ class Container(containers.DeclarativeContainer):
     )
 
 
+    weaviate_connection_manager = providers.Singleton(
+        WeaviateConnectionManager,
+        client=weaviate_client
+    )
+
+    batch_inserter = providers.Singleton(
+        AdaptiveBatchInserter,
+        max_batch_size=config.weaviate_insert_max_batch_size,
+        target_latency_seconds=config.weaviate_insert_target_latency_seconds,
+        max_in_flight=config.weaviate_insert_max_in_flight
+    )
+
     vector_db_helper = providers.Singleton(
         VectorDBHelper,
-        client=weaviate_client
+        connection_manager=weaviate_connection_manager,
+        batch_inserter=batch_inserter
+    )
+
+    incremental_grouper = providers.Singleton(
+        IncrementalGrouper,
+        vector_db_helper=vector_db_helper,
+        redis_client=redis_client,
+        seal_after_seconds=config.tail_group_seal_after_seconds
+    )
+
+    regroup_scheduler = providers.Singleton(
+        RegroupScheduler,
+        incremental_grouper=incremental_grouper,
+        redis_client=redis_client,
+        debounce_seconds=config.regroup_debounce_seconds
     )
 
     slack_bolt_app = providers.Singleton(
@@ -77,21 +134,69 @@ class Container(containers.DeclarativeContainer):
 
     message_history_fetcher = providers.Singleton(
         MessageHistoryFetcher,
-        app=slack_bolt_app
+        app=slack_bolt_app,
+        thread_fetch_concurrency=config.slack_thread_fetch_concurrency,
+        thread_fetch_rate_per_minute=config.slack_thread_fetch_rate_per_minute
+    )
+
+    cache_invalidation_bus = providers.Singleton(
+        CacheInvalidationBus.shared,
+        redis_client=sync_redis_client
+    )
+
+    cache_metrics = providers.Singleton(CacheMetrics)
+
+    cache_metrics_reporter = providers.Singleton(
+        CacheMetricsReporter,
+        redis_client=redis_client,
+        cache_metrics=cache_metrics,
+        interval_seconds=config.cache_metrics_interval_seconds
     )
 
     slack_meta_info_provider = providers.Singleton(
         SlackMetaInfo,
         slack_app=slack_bolt_app,
         redis_client=redis_client,
-        admin_user_ids=config.admin_user_ids
+        admin_user_ids=config.admin_user_ids,
+        invalidation_bus=cache_invalidation_bus,
+        cache_metrics=cache_metrics,
+        local_cache_size=config.slack_meta_local_cache_size
+    )
+
+    workspace_directory_warmer = providers.Singleton(
+        WorkspaceDirectoryWarmer,
+        slack_app=slack_bolt_app,
+        slack_meta_info_provider=slack_meta_info_provider
+    )
+
+    channel_sync_state_store = providers.Singleton(
+        ChannelSyncStateStore,
+        redis_client=redis_client
+    )
+
+    history_archive = providers.Singleton(
+        HistoryArchive,
+        base_dir=config.history_archive_dir
+    )
+
+    history_ingestion_pipeline = providers.Singleton(
+        HistoryIngestionPipeline,
+        message_history_fetcher=message_history_fetcher,
+        vector_db_helper=vector_db_helper,
+        incremental_grouper=incremental_grouper,
+        regroup_scheduler=regroup_scheduler,
+        slack_meta_info_provider=slack_meta_info_provider,
+        history_archive=history_archive,
+        queue_size=config.history_ingestion_queue_size
     )
 
     slack_utilities = providers.Singleton(
         SlackUtilities,
         vector_db_helper=vector_db_helper,
         message_history_fetcher=message_history_fetcher,
-        slack_meta_info_provider=slack_meta_info_provider
+        slack_meta_info_provider=slack_meta_info_provider,
+        channel_sync_state_store=channel_sync_state_store,
+        history_ingestion_pipeline=history_ingestion_pipeline
     )
 
     template_env = providers.Singleton(Environment, loader=BaseLoader())
@@ -156,6 +261,32 @@ class Container(containers.DeclarativeContainer):
         n8n_provider=n8n_provider
     )
 
+    channel_event_queue = providers.Singleton(
+        ChannelEventQueue,
+        redis_client=redis_client,
+        max_concurrent_channels=config.event_queue_max_concurrent_channels,
+        worker_index=config.slack_worker_index,
+        worker_count=config.slack_worker_count
+    )
+
+    slack_worker_registry = providers.Singleton(
+        SlackWorkerRegistry,
+        redis_client=redis_client,
+        channel_event_queue=channel_event_queue
+    )
+
+    event_deduplicator = providers.Singleton(
+        EventDeduplicator,
+        redis_client=redis_client,
+        ttl_seconds=config.event_dedup_ttl_seconds
+    )
+
+    bulk_message_deleter = providers.Singleton(
+        BulkMessageDeleter,
+        rate_per_minute=config.slack_delete_rate_per_minute,
+        concurrency=config.slack_delete_concurrency
+    )
+
     slack_app = providers.Singleton(
         SlackMessageHandler,
         slack_bolt_app=slack_bolt_app,
@@ -163,7 +294,11 @@ class Container(containers.DeclarativeContainer):
         state_manager=state_manager,
         role_assignment=role_assignment,
         slack_app_token=config.slack_app_token,
-        n8n_manager=n8n_manager
+        n8n_manager=n8n_manager,
+        channel_event_queue=channel_event_queue,
+        regroup_scheduler=regroup_scheduler,
+        event_deduplicator=event_deduplicator,
+        bulk_message_deleter=bulk_message_deleter
     )
 
     app_manager = providers.Singleton(
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+
+from slack_sdk.errors import SlackApiError
+
+from utils.rate_limiter import AsyncTokenBucket, call_rate_limited
+
+
+class BulkMessageDeleter:
+    # chat.delete and conversations.replies are Tier 3 methods: 50+ requests per minute
+    TIER_3_RATE_PER_MINUTE = 50
+    PROGRESS_REPORT_EVERY = 25
+
+    def __init__(self, rate_per_minute: int = TIER_3_RATE_PER_MINUTE, concurrency: int = 5,
+                 max_attempts: int = 5) -> None:
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.rate_limiter = AsyncTokenBucket(rate_per_minute, capacity=self.concurrency)
+        # Authors (user or bot ids) whose messages can only be deleted with as_user
+        self._needs_as_user: set[str] = set()
+
+    async def _call(self, method, **kwargs):
+        return await call_rate_limited(self.rate_limiter, method, self.max_attempts, **kwargs)
+
+    async def delete_message(self, client, channel_id: str, message: dict) -> bool:
+        author = message.get('user') or message.get('bot_id')
+        as_user = author in self._needs_as_user
+        try:
+            await self._call(client.chat_delete, channel=channel_id, ts=message['ts'], as_user=as_user)
+            return True
+        except SlackApiError as e:
+            if as_user:
+                logging.debug(f"Can't delete message {message['ts']}, error: {e}")
+                return False
+            logging.debug(f"Can't delete message {message['ts']}, will retry as user, error: {e}")
+        try:
+            await self._call(client.chat_delete, channel=channel_id, ts=message['ts'], as_user=True)
+            self._needs_as_user.add(author)
+            return True
+        except SlackApiError as e:
+            logging.debug(f"Can't delete message {message['ts']} as user, error: {e}")
+            return False
+
+    async def _fetch_thread_replies(self, client, channel_id: str, thread_ts: str) -> list[dict]:
+        try:
+            response = await self._call(client.conversations_replies, channel=channel_id, ts=thread_ts)
+        except SlackApiError as e:
+            logging.error(f"Error fetching replies for thread {thread_ts}: {e}")
+            return []
+        return [msg for msg in response.get('messages', []) if msg['ts'] != thread_ts]
+
+    async def _report(self, client, channel_id: str, user_id: str, text: str) -> None:
+        try:
+            await client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+        except Exception as e:
+            logging.debug(f"Can't report delete progress to {user_id}: {e}")
+
+    async def delete_last_messages(self, client, channel_id: str, count: int, user_id: str) -> int:
+        """Delete the last `count` messages of a channel together with their thread replies."""
+        response = await client.conversations_history(channel=channel_id, limit=count)
+        parents = response.get('messages', [])
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        reply_batches = await asyncio.gather(*(
+            bounded(self._fetch_thread_replies(client, channel_id, msg['thread_ts']))
+            for msg in parents if msg.get('thread_ts')
+        ))
+        replies = [reply for batch in reply_batches for reply in batch]
+        total = len(parents) + len(replies)
+        await self._report(client, channel_id, user_id, f"Deleting {total} messages...")
+
+        deleted = failed = 0
+
+        async def delete(message):
+            nonlocal deleted, failed
+            if await bounded(self.delete_message(client, channel_id, message)):
+                deleted += 1
+            else:
+                failed += 1
+            done = deleted + failed
+            if done % self.PROGRESS_REPORT_EVERY == 0 and done < total:
+                await self._report(client, channel_id, user_id, f"Deleted {deleted}/{total} messages...")
+
+        # Replies go first, so thread parents don't linger as "This message was deleted" placeholders
+        await asyncio.gather(*(delete(message) for message in replies))
+        await asyncio.gather(*(delete(message) for message in parents))
+
+        summary = f"Deleted {deleted}/{total} messages."
+        if failed:
+            summary += f" {failed} could not be deleted."
+        await self._report(client, channel_id, user_id, summary)
+        return deleted
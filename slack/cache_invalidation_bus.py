@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import threading
+import weakref
+from typing import Callable, Iterable
+
+
+class CacheInvalidationBus:
+    """
+    Broadcasts cache keys that must be dropped from in-process caches of every process
+    (API workers, Slack workers, Celery workers) over Redis pub/sub.
+    One subscription thread is shared by all containers of a process talking to the same Redis.
+    Instances are per process id: a forked worker doesn't inherit the parent's thread, it starts its own.
+    The thread listens with a sync client, off any event loop; invalidations are published with
+    the async client of the caller, since async clients are bound to the loop they were created on.
+    """
+    CHANNEL = "slack_meta_info:invalidate"
+    _shared: dict[tuple, "CacheInvalidationBus"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, redis_client) -> None:
+        self.redis_client = redis_client
+        self._listeners: list[weakref.WeakMethod] = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def shared(cls, redis_client) -> "CacheInvalidationBus":
+        kwargs = redis_client.connection_pool.connection_kwargs
+        key = (os.getpid(), kwargs.get('host'), kwargs.get('port'), kwargs.get('db'))
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(redis_client)
+            return cls._shared[key]
+
+    def subscribe(self, listener: Callable[[list[str]], None]) -> None:
+        """Register a bound method called with invalidated keys; it is dropped once its owner is collected."""
+        with self._lock:
+            self._listeners.append(weakref.WeakMethod(listener))
+            if self._thread is None or not self._thread.is_alive():
+                try:
+                    pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(**{self.CHANNEL: self._on_message})
+                    self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+                except Exception as e:
+                    logging.error(f"Can't subscribe to cache invalidations, local caches may serve stale data: {e}")
+
+    async def publish(self, redis_client, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if keys:
+            await redis_client.publish(self.CHANNEL, json.dumps(keys))
+
+    def _on_message(self, message) -> None:
+        try:
+            keys = json.loads(message['data'])
+        except Exception as e:
+            logging.error(f"Malformed cache invalidation message: {e}")
+            return
+        with self._lock:
+            listeners = [ref() for ref in self._listeners]
+            self._listeners = [ref for ref, listener in zip(self._listeners, listeners) if listener is not None]
+        for listener in listeners:
+            if listener is not None:
+                listener(keys)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                self._thread.stop()
+                self._thread = None
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from redis.exceptions import WatchError
+
+from utils.consistent_hash import HashRing
+
+
+class ChannelEventQueue:
+    """
+    Durable per-channel FIFO of Slack events backed by Redis lists.
+    Each channel is drained by a single worker task, so events of one channel are processed
+    in order while different channels are processed in parallel. An event is removed from
+    its list only after it was handled, so events survive a restart of the process.
+    With several socket-mode processes every channel is owned by exactly one of them,
+    events received by another process are handed over through Redis.
+    """
+    # Channels with pending events, a channel is removed once drained
+    CHANNELS_KEY = "event_queue:channels"
+    # Every channel that ever had an event, kept for reporting the channel -> worker assignment
+    KNOWN_CHANNELS_KEY = "event_queue:known_channels"
+    DEAD_LETTER_KEY = "event_queue:dead_letter"
+    WAKEUP_CHANNEL = "event_queue:wakeup"
+    SWEEP_INTERVAL_SECONDS = 30
+
+    def __init__(self, redis_client, max_concurrent_channels: int = 8,
+                 worker_index: int = 0, worker_count: int = 1) -> None:
+        self.redis_client = redis_client
+        self.max_concurrent_channels = max(1, max_concurrent_channels)
+        # Channels are sharded between socket-mode worker processes, only the owner drains a channel
+        self.worker_index = worker_index
+        self.ring = HashRing(range(max(1, worker_count)))
+        self._handler: Optional[Callable[[dict[str, Any]], Awaitable[None]]] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._workers: dict[str, asyncio.Task] = {}
+        self._woken: set[str] = set()
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _key(self, channel_id: str) -> str:
+        return f"event_queue:channel_id:{channel_id}"
+
+    @property
+    def active_channels(self) -> list[str]:
+        return sorted(self._workers.keys())
+
+    def owner_of(self, channel_id: str) -> int:
+        return self.ring.get_node(channel_id)
+
+    def owns(self, channel_id: str) -> bool:
+        return self.owner_of(channel_id) == self.worker_index
+
+    async def start(self, handler: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+        self._handler = handler
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_channels)
+        if len(self.ring.nodes) > 1:
+            self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.WAKEUP_CHANNEL)
+            self._listener = asyncio.create_task(self._listen())
+            self._sweeper = asyncio.create_task(self._sweep_periodically())
+        # Pick up events left over by a previous run
+        await self._sweep()
+
+    async def stop(self) -> None:
+        for task in (self._listener, self._sweeper):
+            if task:
+                task.cancel()
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def _listen(self) -> None:
+        async for message in self._pubsub.listen():
+            self._on_wakeup(message['data'].decode('utf-8'))
+
+    async def _sweep(self) -> None:
+        for channel_id in await self.redis_client.smembers(self.CHANNELS_KEY):
+            self._on_wakeup(channel_id.decode('utf-8'))
+
+    async def _sweep_periodically(self) -> None:
+        # Pub/sub is fire-and-forget, the sweep catches wakeups missed while a worker was restarting
+        while True:
+            await asyncio.sleep(self.SWEEP_INTERVAL_SECONDS)
+            try:
+                await self._sweep()
+            except Exception as e:
+                logging.error(f"Error sweeping event queues: {e}")
+
+    def _on_wakeup(self, channel_id: str) -> None:
+        if self.owns(channel_id):
+            self._wake(channel_id)
+
+    async def enqueue(self, channel_id: str, event: dict[str, Any]) -> None:
+        envelope = json.dumps({"enqueued_at": time.time(), "event": event})
+        pipe = self.redis_client.pipeline()
+        pipe.rpush(self._key(channel_id), envelope)
+        pipe.sadd(self.CHANNELS_KEY, channel_id)
+        pipe.sadd(self.KNOWN_CHANNELS_KEY, channel_id)
+        if not self.owns(channel_id):
+            pipe.publish(self.WAKEUP_CHANNEL, channel_id)
+        await pipe.execute()
+        if self.owns(channel_id):
+            self._wake(channel_id)
+
+    def _wake(self, channel_id: str) -> None:
+        if self._handler is None:
+            logging.warning(f"Event queue is not started, event for channel {channel_id} stays queued")
+            return
+        self._woken.add(channel_id)
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+
+    async def _drain(self, channel_id: str) -> None:
+        key = self._key(channel_id)
+        while True:
+            self._woken.discard(channel_id)
+            raw = await self.redis_client.lindex(key, 0)
+            if raw is None:
+                if channel_id in self._woken:
+                    continue
+                await self._forget_if_empty(channel_id)
+                if channel_id in self._woken:
+                    continue
+                break
+            async with self._semaphore:
+                try:
+                    await self._handler(json.loads(raw)["event"])
+                except Exception as e:
+                    logging.error(f"Error processing queued event in channel {channel_id}, moving it to dead letter: {e}")
+                    await self.redis_client.rpush(self.DEAD_LETTER_KEY, raw)
+            await self.redis_client.lpop(key)
+        self._workers.pop(channel_id, None)
+
+    async def _forget_if_empty(self, channel_id: str) -> None:
+        """Drop a drained channel from the channel set, so sweeps and stats don't scan it forever."""
+        key = self._key(channel_id)
+        async with self.redis_client.pipeline() as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.llen(key):
+                    return
+                pipe.multi()
+                pipe.srem(self.CHANNELS_KEY, channel_id)
+                await pipe.execute()
+            except WatchError:
+                # An event was pushed meanwhile, enqueue added the channel again and woke its owner
+                pass
+
+    async def get_stats(self) -> dict[str, Any]:
+        """Queue depth and lag (age of the oldest pending event) per channel."""
+        channel_ids = [c.decode('utf-8') for c in await self.redis_client.smembers(self.CHANNELS_KEY)]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for channel_id in channel_ids:
+            pipe.llen(self._key(channel_id))
+            pipe.lindex(self._key(channel_id), 0)
+        pipe.llen(self.DEAD_LETTER_KEY)
+        *results, dead_letter_depth = await pipe.execute()
+
+        now = time.time()
+        channels = {}
+        for i, channel_id in enumerate(channel_ids):
+            depth, head = results[2 * i], results[2 * i + 1]
+            if not depth:
+                continue
+            lag = now - json.loads(head)["enqueued_at"] if head else 0.0
+            channels[channel_id] = {"depth": depth, "lag_seconds": round(lag, 3),
+                                    "worker": self.owner_of(channel_id)}
+        return {
+            "total_depth": sum(c["depth"] for c in channels.values()),
+            "max_lag_seconds": max((c["lag_seconds"] for c in channels.values()), default=0.0),
+            "dead_letter_depth": dead_letter_depth,
+            "channels": channels,
+        }
@@ -0,0 +1,40 @@
+import logging
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ChannelSyncState(BaseModel):
+    channel_id: str
+    # High-water mark: everything posted up to this ts has been ingested
+    latest_ts: Optional[str] = None
+    # Window and pagination cursor of a sync that has not finished yet
+    window_oldest: Optional[str] = None
+    window_latest: Optional[str] = None
+    cursor: Optional[str] = None
+
+    def is_in_progress(self) -> bool:
+        return self.cursor is not None
+
+
+class ChannelSyncStateStore:
+    def __init__(self, redis_client) -> None:
+        self.redis_client = redis_client
+
+    def _key(self, channel_id: str) -> str:
+        return f"channel_sync:channel_id:{channel_id}"
+
+    async def load(self, channel_id: str) -> ChannelSyncState:
+        value = await self.redis_client.get(self._key(channel_id))
+        if value is not None:
+            try:
+                return ChannelSyncState.model_validate_json(value)
+            except Exception as e:
+                logging.error(f"Error decoding sync state for channel {channel_id}, starting over: {e}")
+        return ChannelSyncState(channel_id=channel_id)
+
+    async def save(self, state: ChannelSyncState) -> None:
+        await self.redis_client.set(self._key(state.channel_id), state.model_dump_json())
+
+    async def reset(self, channel_id: str) -> None:
+        await self.redis_client.delete(self._key(channel_id))
@@ -0,0 +1,65 @@
+import logging
+from typing import Any
+
+from cachetools import TTLCache
+
+
+class EventDeduplicator:
+    """
+    Drops Slack events that were already seen, e.g. redeliveries after a socket reconnect or a slow ack.
+    A small in-process cache answers repeated deliveries to the same process, Redis SET NX makes the
+    decision shared between processes.
+    """
+    STATS_KEY = "event_dedup:stats"
+
+    def __init__(self, redis_client, ttl_seconds: int = 60 * 60, local_cache_size: int = 10_000) -> None:
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self._seen = TTLCache(maxsize=local_cache_size, ttl=ttl_seconds)
+
+    def _dedup_key(self, event: dict[str, Any]) -> str:
+        event_type = event.get("type", "event")
+        if event.get("subtype"):
+            event_type = f"{event_type}.{event['subtype']}"
+        return f"event_dedup:{event_type}:channel_id:{event.get('channel')}:ts:{event.get('ts')}"
+
+    async def is_duplicate(self, event: dict[str, Any]) -> bool:
+        key = self._dedup_key(event)
+        if key in self._seen:
+            await self._count_duplicate(key, count_event=True)
+            return True
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.set(key, 1, nx=True, ex=self.ttl_seconds)
+        pipe.hincrby(self.STATS_KEY, "events", 1)
+        is_new, _ = await pipe.execute()
+        # Only remembered once Redis has answered, if it fails the redelivery must not be dropped
+        self._seen[key] = True
+        if not is_new:
+            await self._count_duplicate(key)
+            return True
+        return False
+
+    async def forget(self, event: dict[str, Any]) -> None:
+        """Undo is_duplicate for an event that could not be handed over, so its redelivery is processed."""
+        key = self._dedup_key(event)
+        self._seen.pop(key, None)
+        await self.redis_client.delete(key)
+
+    async def _count_duplicate(self, key: str, count_event: bool = False) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        if count_event:
+            pipe.hincrby(self.STATS_KEY, "events", 1)
+        pipe.hincrby(self.STATS_KEY, "duplicates", 1)
+        await pipe.execute()
+        logging.info(f"Dropping duplicate event {key}")
+
+    async def get_stats(self) -> dict[str, Any]:
+        stats = {k.decode('utf-8'): int(v) for k, v in (await self.redis_client.hgetall(self.STATS_KEY)).items()}
+        events = stats.get("events", 0)
+        duplicates = stats.get("duplicates", 0)
+        return {
+            "events": events,
+            "duplicates": duplicates,
+            "duplicate_rate": round(duplicates / events, 4) if events else 0.0,
+        }
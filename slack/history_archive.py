@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import itertools
+import json
+import logging
+from decimal import Decimal
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+from pydantic import BaseModel
+
+from slack.struct.history_page import HistoryPage
+
+
+class ArchiveSegment(BaseModel):
+    oldest_ts: str
+    latest_ts: str
+    offset: int
+    length: int
+    count: int
+
+    def overlaps(self, oldest: Optional[str], latest: Optional[str]) -> bool:
+        if oldest is not None and Decimal(self.latest_ts) < Decimal(oldest):
+            return False
+        if latest is not None and Decimal(self.oldest_ts) > Decimal(latest):
+            return False
+        return True
+
+
+class HistoryArchive:
+    """
+    Append-only, compressed archive of raw Slack messages, one directory per channel.
+    messages.ndjson.gz is a sequence of gzip members (one per appended page, NDJSON inside),
+    index.ndjson maps the ts range of every member to its byte offset, so a time range
+    can be read back without decompressing the whole archive.
+    Messages are keyed by ts, already archived ones are not appended again.
+    The methods do blocking file I/O, async callers run them with asyncio.to_thread.
+    """
+    DATA_FILE = "messages.ndjson.gz"
+    INDEX_FILE = "index.ndjson"
+
+    def __init__(self, base_dir: str, compression_level: int = 6) -> None:
+        self.base_dir = Path(base_dir)
+        self.compression_level = compression_level
+
+    def _channel_dir(self, channel_id: str) -> Path:
+        return self.base_dir / channel_id
+
+    def append(self, channel_id: str, messages: list[dict]) -> Optional[ArchiveSegment]:
+        """Append messages not archived yet as a new segment of the channel archive."""
+        messages = [msg for msg in messages if msg.get('ts')]
+        if not messages:
+            return None
+        timestamps = [Decimal(msg['ts']) for msg in messages]
+        archived = {msg['ts'] for msg in self.iter_messages(channel_id, str(min(timestamps)), str(max(timestamps)))}
+        messages = [msg for msg in messages if msg['ts'] not in archived]
+        if not messages:
+            return None
+        channel_dir = self._channel_dir(channel_id)
+        channel_dir.mkdir(parents=True, exist_ok=True)
+
+        payload = "".join(json.dumps(msg, separators=(',', ':')) + "\n" for msg in messages)
+        member = gzip.compress(payload.encode('utf-8'), compresslevel=self.compression_level)
+        timestamps = [Decimal(msg['ts']) for msg in messages]
+
+        with open(channel_dir / self.DATA_FILE, 'ab') as f:
+            offset = f.seek(0, 2)
+            f.write(member)
+        segment = ArchiveSegment(
+            oldest_ts=str(min(timestamps)),
+            latest_ts=str(max(timestamps)),
+            offset=offset,
+            length=len(member),
+            count=len(messages)
+        )
+        # The index is written last, a segment only becomes visible once it is complete
+        with open(channel_dir / self.INDEX_FILE, 'a') as f:
+            f.write(segment.model_dump_json() + "\n")
+        logging.info(f"Archived {len(messages)} messages of channel {channel_id} ({len(member)} bytes)")
+        return segment
+
+    def read_index(self, channel_id: str) -> list[ArchiveSegment]:
+        index_path = self._channel_dir(channel_id) / self.INDEX_FILE
+        if not index_path.exists():
+            return []
+        with open(index_path) as f:
+            return [ArchiveSegment.model_validate_json(line) for line in f if line.strip()]
+
+    def iter_messages(self, channel_id: str, oldest: Optional[str] = None,
+                      latest: Optional[str] = None) -> Iterator[dict]:
+        """Stream archived messages with oldest <= ts <= latest, decompressing only matching segments."""
+        segments = [segment for segment in self.read_index(channel_id) if segment.overlaps(oldest, latest)]
+        if not segments:
+            return
+        oldest_ts = Decimal(oldest) if oldest is not None else None
+        latest_ts = Decimal(latest) if latest is not None else None
+        with open(self._channel_dir(channel_id) / self.DATA_FILE, 'rb') as f:
+            for segment in segments:
+                f.seek(segment.offset)
+                payload = gzip.decompress(f.read(segment.length))
+                for line in payload.splitlines():
+                    msg = json.loads(line)
+                    ts = Decimal(msg['ts'])
+                    if (oldest_ts is None or ts >= oldest_ts) and (latest_ts is None or ts <= latest_ts):
+                        yield msg
+
+    async def iter_pages(self, channel_id: str, oldest: Optional[str] = None, latest: Optional[str] = None,
+                         page_size: int = 200) -> AsyncIterator[HistoryPage]:
+        """Replay the archive as history pages, e.g. to re-ingest a channel without calling Slack."""
+        messages = self.iter_messages(channel_id, oldest, latest)
+        # Segments are decompressed off the event loop, one page at a time
+        while batch := await asyncio.to_thread(list, itertools.islice(messages, page_size)):
+            yield HistoryPage(messages=batch)
@@ -0,0 +1,106 @@
+import asyncio
+import inspect
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from slack.history_archive import HistoryArchive
+from slack.struct.history_page import HistoryPage
+
+_END = object()
+
+
+class HistoryIngestionPipeline:
+    """
+    Streams history pages through fetch -> clean -> insert -> group stages.
+    Stages are connected with bounded queues, so at most a few pages are held in memory
+    and network-bound stages (Slack, Weaviate) run concurrently.
+    """
+
+    def __init__(self, message_history_fetcher, vector_db_helper, incremental_grouper, regroup_scheduler,
+                 slack_meta_info_provider, history_archive: HistoryArchive, queue_size: int = 2):
+        self.message_history_fetcher = message_history_fetcher
+        self.vector_db_helper = vector_db_helper
+        self.incremental_grouper = incremental_grouper
+        self.regroup_scheduler = regroup_scheduler
+        self.slack_meta_info_provider = slack_meta_info_provider
+        self.history_archive = history_archive
+        self.queue_size = max(1, queue_size)
+
+    async def run(
+        self,
+        channel_id: str,
+        pages: AsyncIterator[HistoryPage],
+        on_page_ingested: Optional[Callable[[HistoryPage], Optional[Awaitable[None]]]] = None,
+        group: bool = True,
+        archive: bool = True
+    ) -> int:
+        """Ingest all pages, returns the number of inserted messages."""
+        clean_queue = asyncio.Queue(maxsize=self.queue_size)
+        insert_queue = asyncio.Queue(maxsize=self.queue_size)
+        group_queue = asyncio.Queue()
+        ingested = 0
+
+        async def fetch_stage():
+            async for page in pages:
+                await clean_queue.put(page)
+            await clean_queue.put(_END)
+
+        async def clean_stage():
+            while (page := await clean_queue.get()) is not _END:
+                cleaned = await self.message_history_fetcher.cleanup_messages(
+                    page.messages, channel_id, self.slack_meta_info_provider)
+                await insert_queue.put((page, cleaned))
+            await insert_queue.put(_END)
+
+        async def insert_stage():
+            nonlocal ingested
+            while (item := await insert_queue.get()) is not _END:
+                page, cleaned = item
+                if cleaned:
+                    report = await self.vector_db_helper.add_messages(cleaned, channel_id)
+                    ingested += report.inserted
+                    if report.failed:
+                        # The page is not committed, a resumed sync fetches it again and inserts what is missing
+                        raise RuntimeError(f"{len(report.failed)} messages of channel {channel_id} could not be inserted")
+                # Archived at the commit point, so a resumed sync doesn't archive in-flight pages twice
+                if archive:
+                    await asyncio.to_thread(self.history_archive.append, channel_id, page.messages)
+                if on_page_ingested:
+                    result = on_page_ingested(page)
+                    if inspect.isawaitable(result):
+                        await result
+                group_queue.put_nowait(True)
+            group_queue.put_nowait(_END)
+
+        async def group_stage():
+            finished = False
+            ingested_pages = False
+            while not finished:
+                # Coalesce every page inserted while the previous grouping pass was running
+                signals = [await group_queue.get()]
+                while not group_queue.empty():
+                    signals.append(group_queue.get_nowait())
+                finished = _END in signals
+                ingested_pages = ingested_pages or any(signal is not _END for signal in signals)
+                if group and ingested_pages:
+                    # Older pages are still coming until the end, the backlog is only grouped by the last pass
+                    seal_in = await self.incremental_grouper.group_channel(channel_id, final=finished)
+                    # The open tail of a quiet channel is sealed by the scheduler, no new message will trigger it
+                    self.regroup_scheduler.schedule_seal(channel_id, seal_in)
+
+        await self._run_stages(fetch_stage(), clean_stage(), insert_stage(), group_stage())
+        logging.info(f"Ingested {ingested} messages into channel {channel_id}")
+        return ingested
+
+    @staticmethod
+    async def _run_stages(*stages):
+        tasks = [asyncio.create_task(stage) for stage in stages]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        for task in done:
+            if task.exception():
+                raise task.exception()
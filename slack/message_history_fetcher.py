@@ -1,16 +1,33 @@
-import json
+import asyncio
 import logging
+from typing import AsyncIterator
 
 from slack.slack_meta_info import SlackMetaInfo
+from slack.struct.history_page import HistoryPage
+from utils.rate_limiter import AsyncTokenBucket, call_rate_limited
 
 
 class MessageHistoryFetcher:
-    def __init__(self, app):
+    # conversations.replies is a Tier 3 method: 50+ requests per minute per workspace
+    REPLIES_TIER_RATE_PER_MINUTE = 50
+    DEFAULT_THREAD_FETCH_CONCURRENCY = 8
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, app, thread_fetch_concurrency: int = DEFAULT_THREAD_FETCH_CONCURRENCY,
+                 thread_fetch_rate_per_minute: int = REPLIES_TIER_RATE_PER_MINUTE):
         self.app = app
+        self.thread_fetch_concurrency = max(1, thread_fetch_concurrency)
+        self.replies_rate_limiter = AsyncTokenBucket(thread_fetch_rate_per_minute,
+                                                     capacity=self.thread_fetch_concurrency)
 
     async def cleanup_messages(self, messages, channel_id, slack_meta_info_provider: SlackMetaInfo):
         cleaned_messages = []
 
+        # Resolve all authors up front, so the loop below does no I/O per message
+        user_names = await slack_meta_info_provider.get_user_names(msg['user'] for msg in messages if 'user' in msg)
+        user_roles = await slack_meta_info_provider.get_user_roles_in_channel(
+            (msg['user'] for msg in messages if 'user' in msg and msg.get('bot_id') is None), channel_id)
+
         for msg in messages:
             cleaned_msg = {}
             # Extract timestamp
@@ -21,9 +38,8 @@ class MessageHistoryFetcher:
             if 'user' in msg:
                 user_id = msg['user']
                 cleaned_msg['user_id'] = user_id
-                cleaned_msg['user_name'] = await slack_meta_info_provider.get_user_name(user_id)
-                role = slack_meta_info_provider.get_user_role_in_channel(user_id, channel_id) if msg.get(
-                    'bot_id') is None else 'bot'
+                cleaned_msg['user_name'] = user_names.get(user_id)
+                role = user_roles.get(user_id) if msg.get('bot_id') is None else 'bot'
                 cleaned_msg['role'] = role
                 cleaned_msg['type'] = 'user'
             else:
@@ -47,56 +63,80 @@ class MessageHistoryFetcher:
 
         return cleaned_messages
 
-    def save_messages_to_file(self, messages, channel_id):
-        file_path = f"messages_{channel_id}.json"
-        with open(file_path, 'w') as f:
-            json.dump(messages, f)
-        logging.info(f"Saved {len(messages)} messages to {file_path}")
-
-    async def fetch_channel_history(self, channel_id, say, start_timestamp, end_timestamp, max_messages_to_fetch):
+    @staticmethod
+    def is_thread_starter(message):
+        return message.get('thread_ts') and message['ts'] == message['thread_ts']
+
+    async def fetch_thread_replies(self, channel_id, thread_ts, semaphore: asyncio.Semaphore):
+        """
+        Fetch replies of a single thread, excluding the starter message.
+        Errors are raised once retries are exhausted, so the page holding the thread is not committed.
+        """
+        async with semaphore:
+            try:
+                thread_result = await call_rate_limited(
+                    self.replies_rate_limiter, self.app.client.conversations_replies,
+                    self.MAX_ATTEMPTS, channel=channel_id, ts=thread_ts
+                )
+            except Exception as e:
+                logging.error(f"Error fetching replies for thread {thread_ts} in channel {channel_id}: {e}")
+                raise
+        # Exclude the first message since it's already included
+        return thread_result['messages'][1:]
+
+    async def _resolve_page(self, batch_messages, thread_tasks, next_cursor) -> HistoryPage:
+        messages = list(batch_messages)
         try:
-            limit = 200
-
-            messages = []
-            has_more = True
-            next_cursor = None
-            total_fetched = 0
-
-            while has_more and total_fetched < max_messages_to_fetch:
+            thread_results = await asyncio.gather(*thread_tasks)
+        except Exception:
+            for task in thread_tasks:
+                task.cancel()
+            raise
+        for thread_messages in thread_results:
+            messages.extend(thread_messages)
+        return HistoryPage(messages=messages, next_cursor=next_cursor)
+
+    async def iter_history_pages(self, channel_id, start_timestamp, end_timestamp, cursor=None,
+                                 max_messages_to_fetch=None) -> AsyncIterator[HistoryPage]:
+        """
+        Yield history pages (newest first) together with the replies of their threads.
+        Threads of a page are expanded while the next page is being fetched. Each page carries
+        the cursor to resume from once it has been processed.
+        """
+        limit = 200
+        semaphore = asyncio.Semaphore(self.thread_fetch_concurrency)
+        pending = None
+        total_fetched = 0
+        has_more = True
+        try:
+            while has_more and (max_messages_to_fetch is None or total_fetched < max_messages_to_fetch):
+                page_limit = limit if max_messages_to_fetch is None else min(limit, max_messages_to_fetch - total_fetched)
                 result = await self.app.client.conversations_history(
                     channel=channel_id,
                     latest=end_timestamp,
                     oldest=start_timestamp,
-                    limit=min(limit, max_messages_to_fetch - total_fetched),
-                    cursor=next_cursor
+                    limit=page_limit,
+                    cursor=cursor
                 )
 
                 batch_messages = result['messages']
-                messages.extend(batch_messages)
                 total_fetched += len(batch_messages)
-
                 has_more = result.get('has_more', False)
-                next_cursor = result.get('response_metadata', {}).get('next_cursor', "") if has_more else ""
-
-                if total_fetched >= max_messages_to_fetch or not has_more:
-                    break
-
-            # Fetch threads for messages that are the beginning of a thread
-            for message in messages:
-                if message.get('thread_ts') and message['ts'] == message['thread_ts']:
-                    thread_result = await self.app.client.conversations_replies(
-                        channel=channel_id,
-                        ts=message['thread_ts']
-                    )
-                    # Exclude the first message since it's already included
-                    thread_messages = thread_result['messages'][1:]
-                    messages.extend(thread_messages)
-
-            logging.info(f"Fetched {len(messages)} messages from the last 6 months.")
-            say(f"Fetched {len(messages)} messages from the last 6 months, up to a limit of {min(len(messages), max_messages_to_fetch)} messages.")
-            logging.info(messages)
-            return messages
-
-        except Exception as e:
-            logging.error(f"Error fetching channel history: {e}")
-            say("Failed to fetch channel history.")
+                cursor = result.get('response_metadata', {}).get('next_cursor') if has_more else None
+                # Expand threads of this page while the next pages are still being fetched
+                thread_tasks = [
+                    asyncio.create_task(self.fetch_thread_replies(channel_id, message['thread_ts'], semaphore))
+                    for message in batch_messages if self.is_thread_starter(message)
+                ]
+
+                previous, pending = pending, (batch_messages, thread_tasks, cursor or None)
+                if previous:
+                    yield await self._resolve_page(*previous)
+
+            if pending:
+                page, pending = pending, None
+                yield await self._resolve_page(*page)
+        finally:
+            if pending:
+                for task in pending[1]:
+                    task.cancel()
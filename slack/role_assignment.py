@@ -54,12 +54,12 @@ class RoleAssignment:
 
             users = await self.slack_meta_info_provider.get_channel_members_no_role(channel_id)
 
-            await self.send_role_assignment_message(channel_id, users, inviter_id, self.slack_meta_info_provider.get_channel_name(channel_id))
+            await self.send_role_assignment_message(channel_id, users, inviter_id, await self.slack_meta_info_provider.get_channel_name(channel_id))
 
         @self.app.action(re.compile("assign_role_.*"))  # Use regex to match any action_id starting with "assign_role_"
         async def handle_role_assignment(ack, body, say, client, event):
             await ack()
             action_value = body['actions'][0]['value']
             user_id, role, channel_id = action_value.split('_')
-            self.slack_meta_info_provider.set_user_role_in_channel(user_id, channel_id, role)
+            await self.slack_meta_info_provider.set_user_role_in_channel(user_id, channel_id, role)
             await say(f"Assigned <@{user_id}> as {role}.")
@@ -2,20 +2,30 @@ import logging
 from icecream import ic
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from llm.llm_caller import LLMCaller, SatisfactionLevelContext
+from slack.bulk_message_deleter import BulkMessageDeleter
+from slack.channel_event_queue import ChannelEventQueue
+from slack.event_deduplicator import EventDeduplicator
 from slack.role_assignment import RoleAssignment
 from workflows.slack_state_manager import SlackStateManager
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from vectordb.regroup_scheduler import RegroupScheduler
 
 class SlackMessageHandler:
     # TODO remove llm_caller from here, should go to state manger
     def __init__(self, slack_bolt_app, slack_app_token, slack_utilities, state_manager: SlackStateManager,
-                 role_assignment: RoleAssignment, n8n_manager):
+                 role_assignment: RoleAssignment, n8n_manager, channel_event_queue: ChannelEventQueue,
+                 regroup_scheduler: RegroupScheduler, event_deduplicator: EventDeduplicator,
+                 bulk_message_deleter: BulkMessageDeleter):
         self.app = slack_bolt_app
         self.slack_utilities = slack_utilities
         self.state_manager = state_manager
         self.slack_app_token = slack_app_token
         self.role_assignment = role_assignment
         self.n8n_manager = n8n_manager
+        self.channel_event_queue = channel_event_queue
+        self.regroup_scheduler = regroup_scheduler
+        self.event_deduplicator = event_deduplicator
+        self.bulk_message_deleter = bulk_message_deleter
 
     async def are_all_roles_assigned(self, user_name, channel_name, channel_id):
         smip = self.slack_utilities.slack_meta_info_provider
@@ -37,6 +47,7 @@ class SlackMessageHandler:
 
     async def setup_commands_and_events(self):
         await self.role_assignment.register_interaction_handlers()
+        await self.channel_event_queue.start(self.process_message_event)
 
         # Test command for registration verification
         @self.app.command("/test-command")
@@ -69,10 +80,8 @@ class SlackMessageHandler:
                 return
 
             await ack()
-            total_limit = 100
-            await self.slack_utilities.fetch_and_process_channel_history(
+            await self.slack_utilities.sync_channel_history(
                 channel_id,
-                total_limit=total_limit,
                 days_ago=6 * 30,
                 say=say
             )
@@ -94,20 +103,20 @@ class SlackMessageHandler:
                 await say(f"Please specify a valid number of messages to delete.")
                 return
 
-            response = await client.conversations_history(channel=channel_id, limit=messages_to_delete)
-            messages = response.get('messages', [])
+            await self.bulk_message_deleter.delete_last_messages(client, channel_id, messages_to_delete, user_id)
 
-            for message in messages:
-                # Check for and delete threaded messages first
-                thread_ts = message.get('thread_ts')
-                if thread_ts:
-                    thread_response = await client.conversations_replies(channel=channel_id, ts=thread_ts)
-                    thread_messages = thread_response.get('messages', [])
-                    for thread_message in thread_messages:
-                        await self.slack_utilities.delete_message(client, channel_id, thread_message['ts'])
+        @self.app.event("user_change")
+        async def handle_user_change(event):
+            user_id = event.get("user", {}).get("id")
+            if user_id:
+                await self.slack_utilities.slack_meta_info_provider.invalidate_user(user_id)
 
-                # Then delete the message itself
-                await self.slack_utilities.delete_message(client, channel_id, message['ts'])
+        @self.app.event("channel_rename")
+        @self.app.event("group_rename")
+        async def handle_channel_rename(event):
+            channel_id = event.get("channel", {}).get("id")
+            if channel_id:
+                await self.slack_utilities.slack_meta_info_provider.invalidate_channel(channel_id)
 
         @self.app.event("message")
         async def handle_message_events(event, say):
@@ -115,49 +124,54 @@ class SlackMessageHandler:
             if st is not None and (st == "bot_message" or st == "message_deleted"):
                 logging.debug(f"Message subtype is {st}, stopping further processing")
                 return
-
-            ed = await self.slack_utilities.get_data_from_event(event)
-            # TODO this will skip message incoming as no role is assigned, rendering all messages came before role is set to be missed
-            if not ed.user.role and not await self.slack_utilities.slack_meta_info_provider.is_bot(ed.user.id):
-                logging.warning(f"User {ed.user.name} has no role assigned in channel {ed.channel_id} .")
-                if not await self.are_all_roles_assigned(ed.user.name, ed.channel_name, ed.channel_id):
-                    return
-            c_id = ed.channel_id
-            clean_messages = await self.slack_utilities.clean_messages([event], c_id)
-            mhd = await self.slack_utilities.get_message_history_data(clean_messages, c_id)
-            # self.state_manager.handle_message(mhd, ed)
-            # dynamic_context = SatisfactionLevelContext(last_message=mhd.message_txt,
-            #                                           last_messages_history=mhd.last_messages_history)
-            # response = self.state_manager.llm_caller.get_satisfaction_level(dynamic_context)
-            # ic(response)
-            # say(response.json())
-            workflow_data = {
-                "message": {
-                    "text": mhd.message_txt,
-                    "history": mhd.last_messages_history,
-                    "previous_context": mhd.previous_context_merged,
-                    "channel_id": c_id,
-                    "user": {
-                        "id": ed.user.id,
-                        "name": ed.user.name,
-                        "role": ed.user.role
-                    },
-                    "thread_ts": event.get("thread_ts"),
-                    "ts": event.get("ts")
-                }
+            if await self.event_deduplicator.is_duplicate(event):
+                return
+            # Heavy processing happens in background workers, keeping the socket handler responsive
+            try:
+                await self.channel_event_queue.enqueue(event.get("channel"), event)
+            except Exception:
+                await self.event_deduplicator.forget(event)
+                raise
+
+    async def process_message_event(self, event):
+        ed = await self.slack_utilities.get_data_from_event(event)
+        # TODO this will skip message incoming as no role is assigned, rendering all messages came before role is set to be missed
+        if not ed.user.role and not await self.slack_utilities.slack_meta_info_provider.is_bot(ed.user.id):
+            logging.warning(f"User {ed.user.name} has no role assigned in channel {ed.channel_id} .")
+            if not await self.are_all_roles_assigned(ed.user.name, ed.channel_name, ed.channel_id):
+                return
+        c_id = ed.channel_id
+        clean_messages = await self.slack_utilities.clean_messages([event], c_id)
+        mhd = await self.slack_utilities.get_message_history_data(clean_messages, c_id)
+        # self.state_manager.handle_message(mhd, ed)
+        # dynamic_context = SatisfactionLevelContext(last_message=mhd.message_txt,
+        #                                           last_messages_history=mhd.last_messages_history)
+        # response = self.state_manager.llm_caller.get_satisfaction_level(dynamic_context)
+        # ic(response)
+        # say(response.json())
+        workflow_data = {
+            "message": {
+                "text": mhd.message_txt,
+                "history": mhd.last_messages_history,
+                "previous_context": mhd.previous_context_merged,
+                "channel_id": c_id,
+                "user": {
+                    "id": ed.user.id,
+                    "name": ed.user.name,
+                    "role": ed.user.role
+                },
+                "thread_ts": event.get("thread_ts"),
+                "ts": event.get("ts")
             }
+        }
 
-            # Trigger n8n workflow
-            is_success = await self.n8n_manager.trigger_workflow("satisfaction", workflow_data)
-
-            if not is_success:
-                logging.error(f"Failed to process message through n8n")
+        # Trigger n8n workflow
+        is_success = await self.n8n_manager.trigger_workflow("satisfaction", workflow_data)
 
-            await self.slack_utilities.add_messages(clean_messages, ed.channel_id)
-            mes = clean_messages[0]
-            tts = mes.get("thread_ts")
-            if tts and tts != mes.get("ts"):
-                await self.slack_utilities.vector_db_helper.delete_message_group_by_thread_ts(mes)
+        if not is_success:
+            logging.error(f"Failed to process message through n8n")
 
-            await self.slack_utilities.group_all_messages_in_channel(c_id)
-            logging.info(f"New message from {ed.user.name} in {ed.channel_name}: {ed.text} processed")
+        await self.slack_utilities.add_messages(clean_messages, ed.channel_id)
+        # Replies are picked up by the grouper, which regroups their whole thread
+        self.regroup_scheduler.trigger(c_id)
+        logging.info(f"New message from {ed.user.name} in {ed.channel_name}: {ed.text} processed")
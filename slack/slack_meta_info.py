@@ -1,28 +1,112 @@
-import json
+import asyncio
 import logging
+import time
 from functools import partial
-from typing import Any, Callable, Optional
-
-from pydantic import TypeAdapter
+from typing import Any, Callable, Iterable, Optional
 
+from slack.cache_invalidation_bus import CacheInvalidationBus
 from slack.struct.slack_user import SlackUser
-
-def to_json(value: Any) -> str:
-    adapter = TypeAdapter(type(value))
-    return adapter.dump_json(value, exclude_unset=True, exclude_defaults=True, exclude_none=True).decode('utf-8')
-
-def from_json(value: str, parse_as_type: type[Any]) -> Any:
-    adapter = TypeAdapter(parse_as_type)
-    return adapter.validate_json(value.encode('utf-8'))
+from slack.struct.slack_user_profile import SlackUserProfile
+from utils.cache_metrics import CacheMetrics
+from utils.codec import codec_for
+from utils.local_cache import LocalTTLCache, MISSING
 
 class SlackMetaInfo:
     TWO_WEEKS = 14 * 24 * 60 * 60  # Two weeks in seconds
     EXPIRATION_INFINITY = 0
+    BULK_FETCH_CONCURRENCY = 10  # users.info is Tier 4, this keeps bursts well below the limit
+    # Upper bound of how long an entry lives in the in-process tier, per key type.
+    # Entries never outlive their Redis counterpart.
+    LOCAL_TTLS = {
+        "user_profile": 10 * 60,
+        "channel_name": 10 * 60,
+        "workspace_name": 60 * 60,
+        "channel_members_all": 60,
+        "channel_members_no_role": 30,
+        "channel_roles": 60,
+    }
+    DEFAULT_LOCAL_TTL = 60
+    STALE_WHILE_REVALIDATE = 60 * 60  # Expired entries are still served (and refreshed) for this long
+    NEGATIVE_TTL = 5 * 60  # Failed lookups are not retried for this long
+    NEGATIVE_ENTRY = b"null"
+    MIGRATED_ROLES_KEY = "channel_roles:migrated"
 
-    def __init__(self, slack_app, redis_client, admin_user_ids: list[str]) -> None:
+    def __init__(self, slack_app, redis_client, admin_user_ids: list[str], invalidation_bus: CacheInvalidationBus,
+                 cache_metrics: CacheMetrics, local_cache_size: int = 10_000) -> None:
         self.redis_client = redis_client
+        self.metrics = cache_metrics
         self.slack_app = slack_app
         self.admin_user_ids = admin_user_ids
+        self.local_cache = LocalTTLCache(maxsize=local_cache_size)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._refreshing: dict[str, asyncio.Future] = {}
+        self.invalidation_bus = invalidation_bus
+        self.invalidation_bus.subscribe(self._evict_locally)
+
+    def _evict_locally(self, keys: list[str]) -> None:
+        for key in keys:
+            self.local_cache.delete(key)
+
+    async def invalidate(self, *keys: str) -> None:
+        """Drop keys from Redis and from the local caches of every process."""
+        await self.redis_client.delete(*keys)
+        await self._evict_everywhere(*keys)
+
+    async def _evict_everywhere(self, *keys: str) -> None:
+        """Drop keys from the local caches of every process, keeping them in Redis."""
+        self._evict_locally(list(keys))
+        await self.invalidation_bus.publish(self.redis_client, keys)
+
+    async def invalidate_user(self, user_id: str) -> None:
+        await self.invalidate(self._generate_cache_key("user_profile", user_id=user_id))
+
+    async def invalidate_channel(self, channel_id: str) -> None:
+        await self.invalidate(
+            self._generate_cache_key("channel_name", channel_id=channel_id),
+            self._generate_cache_key("channel_members_all", channel_id=channel_id),
+            self._generate_cache_key("channel_members_no_role", channel_id=channel_id),
+        )
+
+    @staticmethod
+    def _key_type(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def _cache_locally(self, key: str, value: Any, ttl: Optional[int]) -> None:
+        """Keep a decoded value in the local tier, expiring no later than it stays fresh in Redis."""
+        local_ttl = self.LOCAL_TTLS.get(self._key_type(key), self.DEFAULT_LOCAL_TTL)
+        if ttl is not None and ttl > 0:
+            local_ttl = min(local_ttl, ttl)
+        self.local_cache.set(key, value, local_ttl)
+
+    def _store(self, pipe, key: str, value: Any, ex: int, parse_as_type: Optional[type[Any]] = None) -> None:
+        """Queue a fetched value on a pipeline and keep it locally, None becomes a short-lived negative entry."""
+        if value is None:
+            pipe.set(key, self.NEGATIVE_ENTRY, ex=self.NEGATIVE_TTL)
+            self._cache_locally(key, None, self.NEGATIVE_TTL)
+            return
+        serialized_value = codec_for(parse_as_type or Any).encode(value)
+        if ex > 0:
+            # Redis keeps the entry past ex, so it can be served while it's being refreshed
+            pipe.set(key, serialized_value, ex=ex + self.STALE_WHILE_REVALIDATE)
+            self._cache_locally(key, value, ex)
+        else:
+            pipe.set(key, serialized_value)
+            self._cache_locally(key, value, None)
+
+    def _decode(self, key: str, raw: bytes, redis_ttl: Optional[int],
+                parse_as_type: Optional[type[Any]] = None) -> tuple[Any, bool]:
+        """Decode a Redis entry into (value, is_stale). Fresh entries are also put into the local tier."""
+        if raw == self.NEGATIVE_ENTRY:
+            self._cache_locally(key, None, redis_ttl)
+            return None, False
+        value = codec_for(parse_as_type or Any).decode(raw)
+        fresh_ttl = None
+        if redis_ttl is not None and redis_ttl > 0:
+            fresh_ttl = redis_ttl - self.STALE_WHILE_REVALIDATE
+            if fresh_ttl <= 0:
+                return value, True
+        self._cache_locally(key, value, fresh_ttl)
+        return value, False
 
     async def fetch_from_cache(
         self,
@@ -33,38 +117,220 @@ class SlackMetaInfo:
         parse_as_type: Optional[type[Any]] = None,
         **kwargs
     ) -> Any:
-        """Fetch data from cache or use the provided fetch function to retrieve it."""
-        value = self.redis_client.get(key)
-        if value is not None:
+        """
+        Fetch data from the local tier, then Redis, or use the provided fetch function to retrieve it.
+        Soft-expired entries are returned immediately and refreshed in the background.
+        """
+        value = self.local_cache.get(key)
+        if value is not MISSING:
+            self.metrics.incr(self._key_type(key), "local_hit")
+            return value
+
+        # Single flight: concurrent misses of the same key share one Redis read and one Slack call
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(
+                self._load(key, fetch_function, ex, *args, parse_as_type=parse_as_type, **kwargs))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(partial(self._forget_in_flight, key))
+        # Shielded, so a cancelled caller doesn't cancel the fetch others are waiting for
+        return await asyncio.shield(in_flight)
+
+    def _forget_in_flight(self, key: str, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    async def _load(
+        self,
+        key: str,
+        fetch_function: Callable[..., Any],
+        ex: int,
+        *args,
+        parse_as_type: Optional[type[Any]] = None,
+        **kwargs
+    ) -> Any:
+        key_type = self._key_type(key)
+        started_at = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        raw, redis_ttl = await pipe.execute()
+        self.metrics.observe(key_type, "redis", time.perf_counter() - started_at)
+        if raw is not None:
             try:
-                if parse_as_type:
-                    return from_json(value.decode('utf-8'), parse_as_type)
-                return json.loads(value.decode('utf-8'))
+                value, is_stale = self._decode(key, raw, redis_ttl, parse_as_type)
+                if is_stale:
+                    self.metrics.incr(key_type, "stale_hit")
+                    self._refresh_in_background(key, fetch_function, ex, *args, parse_as_type=parse_as_type, **kwargs)
+                else:
+                    self.metrics.incr(key_type, "redis_hit")
+                return value
             except Exception as e:
-                logging.error(f"Error decoding JSON from cache for key {key}: {e}")
+                self.metrics.incr(key_type, "decode_error")
+                logging.error(f"Error decoding cached value for key {key}: {e}")
                 # Proceed to fetch fresh data
+        self.metrics.incr(key_type, "miss")
+        return await self._fetch_and_store(key, fetch_function, ex, *args, parse_as_type=parse_as_type, **kwargs)
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        fetch_function: Callable[..., Any],
+        ex: int,
+        *args,
+        parse_as_type: Optional[type[Any]] = None,
+        keep_stale_on_failure: bool = False,
+        **kwargs
+    ) -> Any:
+        key_type = self._key_type(key)
+        started_at = time.perf_counter()
         try:
             value = await fetch_function(*args, **kwargs)
-            if value is not None:
-                if parse_as_type:
-                    serialized_value = to_json(value)
-                else:
-                    serialized_value = json.dumps(value)
-                ex_time = ex if ex > 0 else None
-                self.redis_client.set(key, serialized_value, ex=ex_time)
-                return value
         except Exception as e:
-            logging.error(f"Error while fetching and caching for key {key}: {e}")
-        return None
+            logging.error(f"Error while fetching for key {key}: {e}")
+            value = None
+        self.metrics.observe(key_type, "fetch", time.perf_counter() - started_at)
+        if value is None:
+            # Fetch functions log Slack errors and return None
+            self.metrics.incr(key_type, "fetch_error")
+        if value is None and keep_stale_on_failure:
+            return None
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            self._store(pipe, key, value, ex, parse_as_type)
+            await pipe.execute()
+        except Exception as e:
+            logging.error(f"Error while caching key {key}: {e}")
+        return value
 
-    async def get_user_name(self, user_id: str) -> Optional[str]:
-        key = self._generate_cache_key("user_name", user_id=user_id)
+    def _refresh_in_background(self, key: str, fetch_function: Callable[..., Any], ex: int, *args,
+                               parse_as_type: Optional[type[Any]] = None, **kwargs) -> None:
+        if key in self._refreshing:
+            return
+        # A failed refresh keeps serving the stale value until Redis drops it
+        task = asyncio.ensure_future(self._fetch_and_store(
+            key, fetch_function, ex, *args, parse_as_type=parse_as_type, keep_stale_on_failure=True, **kwargs))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def get_user_profile(self, user_id: str) -> Optional[SlackUserProfile]:
+        key = self._generate_cache_key("user_profile", user_id=user_id)
         return await self.fetch_from_cache(
             key,
-            self._fetch_user_name,
-            user_id=user_id
+            self._fetch_user_profile,
+            user_id=user_id,
+            parse_as_type=SlackUserProfile
         )
 
+    async def get_user_name(self, user_id: str) -> Optional[str]:
+        profile = await self.get_user_profile(user_id)
+        return profile.name if profile else None
+
+    async def get_user_names(self, user_ids: Iterable[str]) -> dict[str, Optional[str]]:
+        profiles = await self.get_user_profiles(user_ids)
+        return {user_id: profile.name if profile else None for user_id, profile in profiles.items()}
+
+    async def get_user_profiles(self, user_ids: Iterable[str]) -> dict[str, Optional[SlackUserProfile]]:
+        """Resolve profiles of many users with one Redis round trip and concurrent Slack lookups for the misses."""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        keys = {user_id: self._generate_cache_key("user_profile", user_id=user_id) for user_id in user_ids}
+        key_type = "user_profile"
+        profiles = {}
+        for user_id, key in keys.items():
+            profile = self.local_cache.get(key)
+            if profile is not MISSING:
+                profiles[user_id] = profile
+        self.metrics.incr(key_type, "local_hit", len(profiles))
+        remote = [user_id for user_id in user_ids if user_id not in profiles]
+
+        misses = []
+        if remote:
+            started_at = time.perf_counter()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for user_id in remote:
+                pipe.get(keys[user_id])
+                pipe.ttl(keys[user_id])
+            results = await pipe.execute()
+            self.metrics.observe(key_type, "redis", time.perf_counter() - started_at)
+            for i, user_id in enumerate(remote):
+                raw, redis_ttl = results[2 * i], results[2 * i + 1]
+                if raw is not None:
+                    try:
+                        profiles[user_id], is_stale = self._decode(keys[user_id], raw, redis_ttl, SlackUserProfile)
+                        if is_stale:
+                            self.metrics.incr(key_type, "stale_hit")
+                            self._refresh_in_background(keys[user_id], self._fetch_user_profile, self.TWO_WEEKS,
+                                                        user_id=user_id, parse_as_type=SlackUserProfile)
+                        else:
+                            self.metrics.incr(key_type, "redis_hit")
+                        continue
+                    except Exception as e:
+                        self.metrics.incr(key_type, "decode_error")
+                        logging.error(f"Error decoding cached value for key {keys[user_id]}: {e}")
+                misses.append(user_id)
+            self.metrics.incr(key_type, "miss", len(misses))
+
+        # Join lookups already in flight, register our own so concurrent single lookups join them
+        joined = {user_id: self._in_flight[keys[user_id]] for user_id in misses if keys[user_id] in self._in_flight}
+        misses = [user_id for user_id in misses if user_id not in joined]
+        loop = asyncio.get_running_loop()
+        owned = {user_id: loop.create_future() for user_id in misses}
+        for user_id, future in owned.items():
+            self._in_flight[keys[user_id]] = future
+
+        try:
+            if misses:
+                semaphore = asyncio.Semaphore(self.BULK_FETCH_CONCURRENCY)
+
+                async def fetch(user_id):
+                    async with semaphore:
+                        started_at = time.perf_counter()
+                        profile = await self._fetch_user_profile(user_id)
+                        self.metrics.observe(key_type, "fetch", time.perf_counter() - started_at)
+                        if profile is None:
+                            self.metrics.incr(key_type, "fetch_error")
+                        return profile
+
+                fetched = await asyncio.gather(*(fetch(user_id) for user_id in misses))
+                pipe = self.redis_client.pipeline(transaction=False)
+                for user_id, profile in zip(misses, fetched):
+                    profiles[user_id] = profile
+                    self._store(pipe, keys[user_id], profile, self.TWO_WEEKS, SlackUserProfile)
+                await pipe.execute()
+        finally:
+            for user_id, future in owned.items():
+                self._forget_in_flight(keys[user_id], future)
+                future.set_result(profiles.get(user_id))
+
+        for user_id, in_flight in joined.items():
+            profiles[user_id] = await asyncio.shield(in_flight)
+        return profiles
+
+    async def cache_user_profiles(self, profiles: Iterable[SlackUserProfile]) -> None:
+        """Write already fetched profiles (e.g. from users.list) with one pipelined round trip."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        keys = []
+        for profile in profiles:
+            key = self._generate_cache_key("user_profile", user_id=profile.id)
+            self._store(pipe, key, profile, self.TWO_WEEKS, SlackUserProfile)
+            keys.append(key)
+        await pipe.execute()
+        # Names may have changed, other processes must not keep serving the old ones from their local tier
+        await self._evict_everywhere(*keys)
+
+    async def cache_channel_names(self, channel_names: dict[str, str]) -> None:
+        """Write already fetched channel names (e.g. from conversations.list) with one pipelined round trip."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        keys = []
+        for channel_id, name in channel_names.items():
+            key = self._generate_cache_key("channel_name", channel_id=channel_id)
+            self._store(pipe, key, name, self.TWO_WEEKS)
+            keys.append(key)
+        await pipe.execute()
+        await self._evict_everywhere(*keys)
+
     async def get_channel_members_all(self, channel_id: str) -> Optional[list[SlackUser]]:
         key = self._generate_cache_key("channel_members_all", channel_id=channel_id)
         return await self.fetch_from_cache(
@@ -97,20 +363,22 @@ class SlackMetaInfo:
             logging.error(f"Error fetching channel members for channel {channel_id}: {e}")
             return None
 
+        profiles = await self.get_user_profiles(members)
+        roles = await self.get_user_roles_in_channel(members, channel_id)
         users = []
         for user_id in members:
-            is_bot = await self.is_bot(user_id)
+            profile = profiles.get(user_id)
+            is_bot = profile.is_bot if profile else None
 
             if is_bot and skip_bots:
                 logging.debug(f"Skipping bot: {user_id}")
                 continue
 
-            user_name = await self.get_user_name(user_id)
-            role = "bot" if is_bot else self.get_user_role_in_channel(user_id, channel_id)
+            user_name = profile.name if profile else None
+            role = "bot" if is_bot else roles.get(user_id)
             if role and skip_members_having_role:
                 logging.debug(f"Found existing role ({role}) for {user_id} ({user_name}), skipping.")
                 continue
-            # TODO Two queries should be replaced with one. First for is_bot and second for user name
             users.append(SlackUser(id=user_id, name=user_name, role=role))
         return users if users else None
 
@@ -133,39 +401,31 @@ class SlackMetaInfo:
 
     async def is_bot(self, user_id: str) -> Optional[bool]:
         """Check if a user is a bot."""
-        key = self._generate_cache_key("user_is_bot", user_id=user_id)
-        result = await self.fetch_from_cache(
-            key=key,
-            fetch_function=self._fetch_is_bot,
-            ex=self.EXPIRATION_INFINITY,
-            user_id=user_id,
-        )
-        if result is not None:
-            return bool(result)
-        else:
-            return None
+        profile = await self.get_user_profile(user_id)
+        return profile.is_bot if profile else None
 
     def get_slack_client(self):
         return self.slack_app.client
 
-    def _fetch_workspace_name(self) -> Optional[str]:
+    async def _fetch_workspace_name(self) -> Optional[str]:
         """Fetch workspace name from Slack API."""
         try:
             client = self.get_slack_client()
-            result = client.team_info()
+            result = await client.team_info()
             return result.get('team', {}).get('name')
         except Exception as e:
             logging.error(f"Error fetching workspace name: {e}")
             return None
 
-    async def _fetch_user_name(self, user_id: str) -> Optional[str]:
-        """Fetch user name from Slack API."""
+    async def _fetch_user_profile(self, user_id: str) -> Optional[SlackUserProfile]:
+        """Fetch user profile from Slack API."""
         try:
             result = await self.get_slack_client().users_info(user=user_id)
-            return result.get('user', {}).get('name')
         except Exception as e:
-            logging.error(f"Error fetching user name for user {user_id}: {e}")
+            logging.error(f"Error fetching user profile for user {user_id}: {e}")
             return None
+        user = result.get('user')
+        return SlackUserProfile.from_api(user) if user else None
 
     async def _fetch_channel_name(self, channel_id: str) -> Optional[str]:
         """Fetch channel name from Slack API."""
@@ -176,28 +436,72 @@ class SlackMetaInfo:
             logging.error(f"Error fetching channel name for channel {channel_id}: {e}")
             return None
 
-    async def _fetch_is_bot(self, user_id: str) -> Optional[bool]:
-        """Fetch bot status from Slack API."""
-        try:
-            result = await self.get_slack_client().users_info(user=user_id)
-            return result.get('user', {}).get('is_bot')
-        except Exception as e:
-            logging.error(f"Error fetching bot status for user {user_id}: {e}")
-            return None
+    async def get_channel_roles(self, channel_id: str) -> dict[str, str]:
+        """Get roles of all users in a channel, read with a single HGETALL."""
+        key = self._generate_cache_key("channel_roles", channel_id=channel_id)
+        roles = self.local_cache.get(key)
+        if roles is not MISSING:
+            self.metrics.incr("channel_roles", "local_hit")
+            return roles
+        started_at = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.sismember(self.MIGRATED_ROLES_KEY, channel_id)
+        raw_roles, migrated = await pipe.execute()
+        self.metrics.observe("channel_roles", "redis", time.perf_counter() - started_at)
+        self.metrics.incr("channel_roles", "redis_hit")
+        if not migrated:
+            raw_roles = await self._migrate_legacy_roles(channel_id, key)
+        roles = {user_id.decode('utf-8'): role.decode('utf-8') for user_id, role in raw_roles.items()}
+        self._cache_locally(key, roles, None)
+        return roles
+
+    async def _migrate_legacy_roles(self, channel_id: str, key: str) -> dict[bytes, bytes]:
+        """Move roles stored as one string per user (user_role:user_id:*:channel_id:*) into the channel hash."""
+        legacy_keys = [legacy_key async for legacy_key in self.redis_client.scan_iter(
+            match=self._generate_cache_key("user_role", user_id="*", channel_id=channel_id))]
+        pipe = self.redis_client.pipeline(transaction=True)
+        if legacy_keys:
+            legacy_roles = await self.redis_client.mget(legacy_keys)
+            mapping = {
+                legacy_key.decode('utf-8').split(":")[2]: role
+                for legacy_key, role in zip(legacy_keys, legacy_roles) if role is not None
+            }
+            # Roles assigned meanwhile into the hash win over the legacy ones
+            for user_id, role in mapping.items():
+                pipe.hsetnx(key, user_id, role)
+            pipe.delete(*legacy_keys)
+        pipe.sadd(self.MIGRATED_ROLES_KEY, channel_id)
+        pipe.hgetall(key)
+        raw_roles = (await pipe.execute())[-1]
+        if legacy_keys:
+            logging.info(f"Migrated {len(legacy_keys)} legacy roles of channel {channel_id}")
+        return raw_roles
 
-    def get_user_role_in_channel(self, user_id: str, channel_id: str) -> Optional[str]:
+    async def get_user_role_in_channel(self, user_id: str, channel_id: str) -> Optional[str]:
         """Get the role of a user in a channel."""
-        key = self._generate_cache_key("user_role", user_id=user_id, channel_id=channel_id)
-        value = self.redis_client.get(key)
-        return value.decode('utf-8') if value else None
+        return (await self.get_channel_roles(channel_id)).get(user_id)
 
-    def set_user_role_in_channel(self, user_id: str, channel_id: str, role_name: str) -> None:
+    async def get_user_roles_in_channel(self, user_ids: Iterable[str], channel_id: str) -> dict[str, Optional[str]]:
+        """Get roles of many users in a channel."""
+        roles = await self.get_channel_roles(channel_id)
+        return {user_id: roles.get(user_id) for user_id in user_ids}
+
+    async def set_user_role_in_channel(self, user_id: str, channel_id: str, role_name: str) -> None:
         """Set the role of a user in a channel."""
-        key = self._generate_cache_key("user_role", user_id=user_id, channel_id=channel_id)
-        self.redis_client.set(key, role_name)
-        # Invalidate the cache for channel members with no role
-        key_no_role = self._generate_cache_key("channel_members_no_role", channel_id=channel_id)
-        self.redis_client.delete(key_no_role)
+        # Make sure legacy roles are moved first, so they can't override this assignment later
+        await self.get_channel_roles(channel_id)
+        roles_key = self._generate_cache_key("channel_roles", channel_id=channel_id)
+        # Cached member lists carry roles, drop them too
+        member_keys = (
+            self._generate_cache_key("channel_members_no_role", channel_id=channel_id),
+            self._generate_cache_key("channel_members_all", channel_id=channel_id),
+        )
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(roles_key, user_id, role_name)
+        pipe.delete(*member_keys)
+        await pipe.execute()
+        await self._evict_everywhere(roles_key, *member_keys)
 
     def _generate_cache_key(self, key_type: str, **identifiers: str) -> str:
         """Generate a cache key based on key type and identifiers."""
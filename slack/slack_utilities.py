@@ -1,18 +1,25 @@
+import inspect
 import logging
 import time
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from slack.channel_sync_state import ChannelSyncStateStore
+from slack.history_ingestion_pipeline import HistoryIngestionPipeline
 from slack.struct.event_data import EventData
 from slack.struct.message_history_data import MessageHistoryData
 from slack.struct.slack_user import SlackUser
 from utils.date_utils import ts_to_rfc3339
 
 class SlackUtilities:
-    def __init__(self, vector_db_helper, message_history_fetcher, slack_meta_info_provider):
+    def __init__(self, vector_db_helper, message_history_fetcher, slack_meta_info_provider,
+                 channel_sync_state_store: ChannelSyncStateStore,
+                 history_ingestion_pipeline: HistoryIngestionPipeline):
         self.vector_db_helper = vector_db_helper
         self.message_history_fetcher = message_history_fetcher
         self.slack_meta_info_provider = slack_meta_info_provider
+        self.channel_sync_state_store = channel_sync_state_store
+        self.history_ingestion_pipeline = history_ingestion_pipeline
 
     async def fetch_and_process_channel_history(self, channel_id, total_limit=1000, days_ago=6 * 30,
                                           say=lambda msg: print(msg)):
@@ -20,10 +27,64 @@ class SlackUtilities:
         oldest = str(int(days_ago.timestamp()))
         latest = str(int(time.time()))
 
-        messages = await self.message_history_fetcher.fetch_channel_history(channel_id, say, oldest, latest, total_limit)
-        self.message_history_fetcher.save_messages_to_file(messages, channel_id)
+        pages = self.message_history_fetcher.iter_history_pages(channel_id, oldest, latest,
+                                                                max_messages_to_fetch=total_limit)
+        ingested = await self.history_ingestion_pipeline.run(channel_id, pages)
+        await self._notify(say, f"Ingested {ingested} messages posted since {days_ago:%Y-%m-%d}.")
 
-        await self.clean_and_add_messages(channel_id, messages)
+    async def sync_channel_history(self, channel_id, days_ago=6 * 30, max_messages_per_run=None,
+                                   say=lambda msg: print(msg)):
+        """
+        Ingest only what was posted since the last completed sync of the channel.
+        Progress is saved after every page, so an interrupted sync (or one stopped by
+        max_messages_per_run) resumes from its cursor on the next call.
+        Replies posted later into already ingested threads are left to the live event handler.
+        """
+        store = self.channel_sync_state_store
+        state = await store.load(channel_id)
+        if state.is_in_progress():
+            logging.info(f"Resuming history sync of channel {channel_id} from cursor {state.cursor}")
+        else:
+            state.window_oldest = state.latest_ts or str(int((datetime.now() - timedelta(days=days_ago)).timestamp()))
+            state.window_latest = f"{time.time():.6f}"
+
+        async def commit_page(page):
+            state.cursor = page.next_cursor
+            await store.save(state)
+
+        pages = self.message_history_fetcher.iter_history_pages(
+            channel_id, state.window_oldest, state.window_latest, cursor=state.cursor,
+            max_messages_to_fetch=max_messages_per_run)
+        try:
+            ingested = await self.history_ingestion_pipeline.run(channel_id, pages, on_page_ingested=commit_page)
+        except Exception as e:
+            logging.error(f"History sync of channel {channel_id} interrupted: {e}")
+            await self._notify(say, "History sync was interrupted, it will resume from the last saved page on the next run.")
+            return 0
+
+        if state.is_in_progress():
+            await self._notify(say, f"Ingested {ingested} messages, history sync will resume on the next run.")
+            return ingested
+
+        state.latest_ts = state.window_latest
+        state.window_oldest = state.window_latest = None
+        await store.save(state)
+        await self._notify(say, f"History is up to date, ingested {ingested} new messages.")
+        return ingested
+
+    async def replay_channel_history_from_archive(self, channel_id, oldest=None, latest=None,
+                                                  say=lambda msg: print(msg)):
+        """Re-ingest archived history of a channel without calling Slack."""
+        pages = self.history_ingestion_pipeline.history_archive.iter_pages(channel_id, oldest, latest)
+        ingested = await self.history_ingestion_pipeline.run(channel_id, pages, archive=False)
+        await self._notify(say, f"Replayed {ingested} archived messages.")
+        return ingested
+
+    @staticmethod
+    async def _notify(say, text):
+        result = say(text)
+        if inspect.isawaitable(result):
+            await result
 
     async def clean_messages(self, messages, channel_id):
         return await self.message_history_fetcher.cleanup_messages(messages, channel_id, self.slack_meta_info_provider)
@@ -31,26 +92,13 @@ class SlackUtilities:
     async def add_messages(self, clean_messages, channel_id):
         await self.vector_db_helper.add_messages(clean_messages, channel_id)
 
-    async def clean_and_add_messages(self, channel_id, messages):
-        clean_messages = await self.clean_messages(messages, channel_id)
-        await self.add_messages(clean_messages, channel_id)
-
-    async def delete_message(self, client, channel_id, ts, as_user=False):
-        try:
-            await client.chat_delete(channel=channel_id, ts=ts, as_user=as_user)
-        except Exception as e:
-            logging.debug(f"Can't delete message, error: {e}")
-            if not as_user:
-                logging.debug(f"Will retry as user")
-                await self.delete_message(client, channel_id, ts, as_user=True)
-
     async def get_data_from_event(self, event):
         channel_id = event.get('channel')
         user_id = event.get('user', "")
         text = event.get('text', '')  # Default to empty string if no text
 
         user_name = await self.slack_meta_info_provider.get_user_name(user_id) or "Unknown User"
-        user_role = self.slack_meta_info_provider.get_user_role_in_channel(user_id, channel_id=channel_id) or ""
+        user_role = await self.slack_meta_info_provider.get_user_role_in_channel(user_id, channel_id=channel_id) or ""
         channel_name = await self.slack_meta_info_provider.get_channel_name(channel_id) or "Unknown Channel"
         user = SlackUser(id=user_id, name=user_name, role=user_role)
 
@@ -62,9 +110,6 @@ class SlackUtilities:
             user=user
         )
 
-    async def group_all_messages_in_channel(self, channel_id):
-        await self.vector_db_helper.group_all_in_channel(channel_id)
-
     async def get_message_history_data(self, clean_messages, channel_id):
         message_txt = self.vector_db_helper.msg_array_to_text(clean_messages, is_db_object=False)
         last_messages_history = await self.vector_db_helper.get_last_x_messages(channel_id, 5)
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any
+
+
+class SlackWorkerRegistry:
+    """Heartbeats of socket-mode worker processes and the channel -> worker assignment."""
+    WORKERS_KEY = "slack_workers"
+    HEARTBEAT_INTERVAL_SECONDS = 15
+
+    def __init__(self, redis_client, channel_event_queue) -> None:
+        self.redis_client = redis_client
+        self.channel_event_queue = channel_event_queue
+
+    async def heartbeat(self) -> None:
+        queue = self.channel_event_queue
+        await self.redis_client.hset(self.WORKERS_KEY, str(queue.worker_index), json.dumps({
+            "pid": os.getpid(),
+            "worker_count": len(queue.ring.nodes),
+            "last_seen": time.time(),
+            "active_channels": queue.active_channels,
+        }))
+
+    async def run_heartbeat(self) -> None:
+        while True:
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logging.error(f"Error sending worker heartbeat: {e}")
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL_SECONDS)
+
+    async def get_status(self) -> dict[str, Any]:
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(self.WORKERS_KEY)
+        pipe.smembers(self.channel_event_queue.KNOWN_CHANNELS_KEY)
+        raw_workers, raw_channels = await pipe.execute()
+        workers = {}
+        for index, raw in raw_workers.items():
+            worker = json.loads(raw)
+            worker["alive"] = now - worker["last_seen"] < 3 * self.HEARTBEAT_INTERVAL_SECONDS
+            workers[index.decode('utf-8')] = worker
+        channels = sorted(c.decode('utf-8') for c in raw_channels)
+        return {
+            "workers": workers,
+            "assignment": {channel_id: self.channel_event_queue.owner_of(channel_id) for channel_id in channels},
+        }
@@ -0,0 +1,8 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class HistoryPage(BaseModel):
+    messages: list[dict]
+    next_cursor: Optional[str] = None
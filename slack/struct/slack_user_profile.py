@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SlackUserProfile(BaseModel):
+    id: str
+    name: Optional[str] = None
+    display_name: Optional[str] = None
+    is_bot: bool = False
+    tz: Optional[str] = None
+
+    @classmethod
+    def from_api(cls, user: dict) -> "SlackUserProfile":
+        """Build a profile from a users.info / users.list user object."""
+        return cls(
+            id=user['id'],
+            name=user.get('name'),
+            display_name=user.get('profile', {}).get('display_name') or user.get('real_name'),
+            is_bot=bool(user.get('is_bot')),
+            tz=user.get('tz'),
+        )
@@ -0,0 +1,63 @@
+import logging
+import time
+from typing import Any, Optional
+
+from slack.slack_meta_info import SlackMetaInfo
+from slack.struct.slack_user_profile import SlackUserProfile
+from utils.rate_limiter import AsyncTokenBucket, call_rate_limited
+
+
+class WorkspaceDirectoryWarmer:
+    """
+    Fills the SlackMetaInfo cache with every user profile and channel name of the workspace,
+    so event handling doesn't call users.info / conversations.info after a deploy.
+    """
+    # users.list and conversations.list are Tier 2 methods: 20+ requests per minute
+    TIER_2_RATE_PER_MINUTE = 20
+    PAGE_SIZE = 200  # Slack recommends no more than 200 results per page
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, slack_app, slack_meta_info_provider: SlackMetaInfo,
+                 rate_per_minute: int = TIER_2_RATE_PER_MINUTE) -> None:
+        self.slack_app = slack_app
+        self.slack_meta_info_provider = slack_meta_info_provider
+        self.rate_limiter = AsyncTokenBucket(rate_per_minute, capacity=1)
+
+    async def _call(self, method, **kwargs):
+        return await call_rate_limited(self.rate_limiter, method, self.MAX_ATTEMPTS, **kwargs)
+
+    async def _pages(self, method, key: str, **kwargs):
+        cursor: Optional[str] = None
+        while True:
+            response = await self._call(method, limit=self.PAGE_SIZE, cursor=cursor, **kwargs)
+            yield response.get(key, [])
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                return
+
+    async def warm_up_users(self) -> int:
+        count = 0
+        async for members in self._pages(self.slack_app.client.users_list, 'members'):
+            await self.slack_meta_info_provider.cache_user_profiles(
+                SlackUserProfile.from_api(member) for member in members
+            )
+            count += len(members)
+        return count
+
+    async def warm_up_channels(self) -> int:
+        count = 0
+        async for channels in self._pages(self.slack_app.client.conversations_list, 'channels',
+                                          types="public_channel,private_channel", exclude_archived=True):
+            await self.slack_meta_info_provider.cache_channel_names(
+                {channel['id']: channel['name'] for channel in channels if channel.get('name')}
+            )
+            count += len(channels)
+        return count
+
+    async def warm_up(self) -> dict[str, Any]:
+        started_at = time.monotonic()
+        users = await self.warm_up_users()
+        channels = await self.warm_up_channels()
+        stats = {"users": users, "channels": channels, "seconds": round(time.monotonic() - started_at, 1)}
+        logging.info(f"Warmed up workspace directory: {stats}")
+        return stats
@@ -0,0 +1,142 @@
+import bisect
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Iterable, Optional
+
+from utils.process_stats import ProcessStatsPublisher
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, cheap to update and to merge across processes."""
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)  # The last one counts everything slower
+        self.total_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"counts": list(self.counts), "total_ms": round(self.total_ms, 3)}
+
+    @classmethod
+    def summarize(cls, histograms: Iterable[dict[str, Any]]) -> dict[str, Any]:
+        """Merge histogram dicts and estimate quantiles as the upper bound of the bucket they fall in."""
+        counts = [0] * (len(cls.BUCKETS_MS) + 1)
+        total_ms = 0.0
+        for histogram in histograms:
+            counts = [a + b for a, b in zip(counts, histogram["counts"])]
+            total_ms += histogram["total_ms"]
+        count = sum(counts)
+        summary = {"count": count, "mean_ms": round(total_ms / count, 3) if count else None}
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            summary[name] = cls._quantile(counts, count, q)
+        return summary
+
+    @classmethod
+    def _quantile(cls, counts: list[int], count: int, q: float):
+        if not count:
+            return None
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= q * count:
+                return cls.BUCKETS_MS[i] if i < len(cls.BUCKETS_MS) else f">{cls.BUCKETS_MS[-1]}"
+
+
+class CacheMetrics:
+    """
+    Per key type counters and latency histograms of one process.
+    Counters: local_hit, redis_hit, stale_hit, miss, fetch_error, decode_error.
+    Latency legs: redis (cache round trip) and fetch (Slack API call on a miss or refresh).
+    """
+    COUNTERS = ("local_hit", "redis_hit", "stale_hit", "miss", "fetch_error", "decode_error")
+    LEGS = ("redis", "fetch")
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.counters: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(self.COUNTERS, 0))
+        self.latencies: dict[str, dict[str, LatencyHistogram]] = defaultdict(
+            lambda: {leg: LatencyHistogram() for leg in self.LEGS})
+
+    def incr(self, key_type: str, counter: str, amount: int = 1) -> None:
+        self.counters[key_type][counter] += amount
+
+    def observe(self, key_type: str, leg: str, seconds: float) -> None:
+        self.latencies[key_type][leg].observe(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "key_types": {
+                key_type: {
+                    "counters": dict(self.counters[key_type]),
+                    "latency": {leg: h.to_dict() for leg, h in self.latencies[key_type].items()},
+                }
+                for key_type in sorted(set(self.counters) | set(self.latencies))
+            },
+        }
+
+    @classmethod
+    def summarize(cls, snapshots: Iterable[dict[str, Any]]) -> dict[str, Any]:
+        """Merge snapshots of several processes into hit rates and latency quantiles per key type."""
+        counters: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(cls.COUNTERS, 0))
+        latencies: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for snapshot in snapshots:
+            for key_type, data in snapshot["key_types"].items():
+                for counter, value in data["counters"].items():
+                    counters[key_type][counter] = counters[key_type].get(counter, 0) + value
+                for leg, histogram in data["latency"].items():
+                    latencies[key_type][leg].append(histogram)
+
+        summary = {}
+        for key_type, c in sorted(counters.items()):
+            lookups = c["local_hit"] + c["redis_hit"] + c["stale_hit"] + c["miss"]
+            summary[key_type] = {
+                **c,
+                "lookups": lookups,
+                "hit_rate": round((lookups - c["miss"]) / lookups, 4) if lookups else None,
+                "local_hit_rate": round(c["local_hit"] / lookups, 4) if lookups else None,
+                "latency": {leg: LatencyHistogram.summarize(h) for leg, h in latencies[key_type].items()},
+            }
+        return summary
+
+
+class CacheMetricsReporter:
+    """Publishes the process' CacheMetrics to Redis, so any process can report on all of them, and logs a summary."""
+    METRICS_KEY = "cache_metrics"
+
+    def __init__(self, redis_client, cache_metrics: CacheMetrics, interval_seconds: int = 60) -> None:
+        self.cache_metrics = cache_metrics
+        self.publisher = ProcessStatsPublisher(redis_client, self.METRICS_KEY, interval_seconds)
+
+    def _collect(self) -> Optional[dict[str, Any]]:
+        snapshot = self.cache_metrics.snapshot()
+        return snapshot if snapshot["key_types"] else None
+
+    async def publish(self) -> None:
+        snapshot = self._collect()
+        if snapshot is not None:
+            await self.publisher.publish(snapshot)
+
+    def log_summary(self) -> None:
+        for key_type, s in CacheMetrics.summarize([self.cache_metrics.snapshot()]).items():
+            fetch = s["latency"]["fetch"]
+            logging.info(
+                f"Cache {key_type}: {s['lookups']} lookups, hit rate {s['hit_rate']}, "
+                f"local {s['local_hit_rate']}, {s['miss']} misses, {s['fetch_error']} fetch errors, "
+                f"{s['decode_error']} decode errors, fetch p50/p95 {fetch['p50_ms']}/{fetch['p95_ms']} ms"
+            )
+
+    async def run(self) -> None:
+        await self.publisher.run(self._collect, on_published=self.log_summary)
+
+    async def get_report(self) -> dict[str, Any]:
+        """Metrics merged over processes that published recently."""
+        snapshots = await self.publisher.read_all()
+        return {"processes": len(snapshots), "key_types": CacheMetrics.summarize(snapshots)}
@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import Any, Optional, Union
+
+from pydantic import TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # Values are written as JSON then
+    msgpack = None
+
+# 0xC1 is never used by msgpack and can't start JSON text, so it tells framed values from legacy plain JSON
+MAGIC = 0xC1
+FORMAT_JSON = 1
+FORMAT_MSGPACK = 2
+
+
+class Codec:
+    """Encodes values of one type for Redis. Values are framed as MAGIC, format byte, payload."""
+
+    def __init__(self, value_type: Any, value_format: Optional[int] = None) -> None:
+        self.adapter = TypeAdapter(value_type)
+        self.format = value_format or (FORMAT_MSGPACK if msgpack else FORMAT_JSON)
+
+    def encode(self, value: Any) -> bytes:
+        if self.format == FORMAT_MSGPACK:
+            payload = msgpack.packb(self.adapter.dump_python(value, mode='json', exclude_defaults=True))
+        else:
+            payload = self.adapter.dump_json(value, exclude_defaults=True)
+        return bytes((MAGIC, self.format)) + payload
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        if not raw or raw[0] != MAGIC:
+            # Written as plain JSON before values were framed
+            return self.adapter.validate_json(raw)
+        value_format, payload = raw[1], raw[2:]
+        if value_format == FORMAT_MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack is not installed, can't decode value")
+            return self.adapter.validate_python(msgpack.unpackb(payload))
+        if value_format == FORMAT_JSON:
+            return self.adapter.validate_json(payload)
+        raise ValueError(f"Unknown value format {value_format}")
+
+
+@lru_cache(maxsize=None)
+def codec_for(value_type: Any) -> Codec:
+    """Codec of a type, built once per process."""
+    return Codec(value_type)
@@ -0,0 +1,26 @@
+import bisect
+import hashlib
+from typing import Hashable, Iterable
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes, so adding a node only moves ~1/N of the keys."""
+
+    def __init__(self, nodes: Iterable[Hashable], replicas: int = 100) -> None:
+        self.nodes = list(nodes)
+        self._ring = sorted(
+            (self._hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def get_node(self, key: str) -> Hashable:
+        if not self._ring:
+            raise ValueError("Hash ring has no nodes")
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
@@ -0,0 +1,51 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Any, Callable, Optional
+
+
+class ProcessStatsPublisher:
+    """
+    Publishes stats of this process to a Redis hash keyed by host:pid, so any process can report on all of them.
+    Entries not refreshed for three intervals belong to dead processes and are dropped when read.
+    """
+
+    def __init__(self, redis_client, key: str, interval_seconds: float) -> None:
+        self.redis_client = redis_client
+        self.key = key
+        self.interval_seconds = interval_seconds
+        self.process_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def publish(self, stats: dict[str, Any]) -> None:
+        await self.redis_client.hset(self.key, self.process_id, json.dumps({**stats, "updated_at": time.time()}))
+
+    async def run(self, collect: Callable[[], Optional[dict[str, Any]]],
+                  on_published: Optional[Callable[[], None]] = None) -> None:
+        """Publish what collect returns every interval, None skips a round."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                stats = collect()
+                if stats is not None:
+                    await self.publish(stats)
+                if on_published:
+                    on_published()
+            except Exception as e:
+                logging.error(f"Error publishing {self.key}: {e}")
+
+    async def read_all(self) -> list[dict[str, Any]]:
+        """Stats of processes that published recently."""
+        now = time.time()
+        fresh, stale = [], []
+        for process_id, raw in (await self.redis_client.hgetall(self.key)).items():
+            stats = json.loads(raw)
+            if now - stats["updated_at"] > 3 * self.interval_seconds:
+                stale.append(process_id)
+            else:
+                fresh.append(stats)
+        if stale:
+            await self.redis_client.hdel(self.key, *stale)
+        return fresh
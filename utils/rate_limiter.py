@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from slack_sdk.errors import SlackApiError
+
+
+class AsyncTokenBucket:
+    """Token bucket limiter for coroutines sharing one Slack API method budget."""
+
+    def __init__(self, rate_per_minute: float, capacity: int = 1) -> None:
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def block_for(self, seconds: float) -> None:
+        """Pause all callers, e.g. when Slack answers 429 with a Retry-After header."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated_at = self._blocked_until
+
+
+def retry_after(e: SlackApiError) -> Optional[float]:
+    """Seconds Slack asks to wait before retrying, None if the error is not a rate limit."""
+    if e.response is None or e.response.status_code != 429:
+        return None
+    headers = e.response.headers or {}
+    return float(headers.get('Retry-After') or headers.get('retry-after') or 1)
+
+
+async def call_rate_limited(rate_limiter: AsyncTokenBucket, method, max_attempts: int = 5, **kwargs):
+    """Call a Slack method under the rate limiter, waiting out 429 responses."""
+    for attempt in range(1, max_attempts + 1):
+        await rate_limiter.acquire()
+        try:
+            return await method(**kwargs)
+        except SlackApiError as e:
+            delay = retry_after(e)
+            if delay is None or attempt == max_attempts:
+                raise
+            logging.debug(f"Rate limited, retrying in {delay}s")
+            rate_limiter.block_for(delay)
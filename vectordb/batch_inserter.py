@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Optional
+
+import weaviate.classes as wvc
+from pydantic import BaseModel
+
+
+class FailedObject(BaseModel):
+    key: Any
+    error: str
+
+
+class BatchInsertReport(BaseModel):
+    inserted: int = 0
+    skipped: int = 0
+    retried: int = 0
+    failed: list[FailedObject] = []
+
+
+class AdaptiveBatchInserter:
+    """
+    Inserts objects with insert_many in batches sized by observed latency: batches grow while
+    Weaviate answers faster than the target and shrink when it slows down or fails. At most
+    max_in_flight batches are sent at once per process. Objects rejected by Weaviate, or part of
+    a batch that failed as a whole, are retried one by one before being reported as failed.
+    With object_uuid, objects get deterministic uuids and inserts are idempotent: objects that
+    already exist are skipped, so re-inserting a batch the server applied creates no duplicates.
+    """
+
+    def __init__(self, min_batch_size: int = 10, max_batch_size: int = 500, target_latency_seconds: float = 1.0,
+                 max_in_flight: int = 4, max_attempts: int = 3) -> None:
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.target_latency_seconds = target_latency_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.batch_size = min(max(50, self.min_batch_size), self.max_batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+
+    def _adjust_batch_size(self, latency: float, failed: bool) -> None:
+        if failed or latency > self.target_latency_seconds:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif latency < self.target_latency_seconds / 2:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    async def insert(self, collection, objects: list[dict[str, Any]],
+                     key: Callable[[dict[str, Any]], Any] = lambda obj: obj.get('ts'),
+                     object_uuid: Optional[Callable[[dict[str, Any]], str]] = None) -> BatchInsertReport:
+        """Insert objects into a collection, key identifies failed objects in the report."""
+        report = BatchInsertReport()
+        to_retry: list[dict[str, Any]] = []
+
+        async def send(batch):
+            started_at = time.monotonic()
+            try:
+                if object_uuid:
+                    existing = await self._existing_uuids(collection, [object_uuid(obj) for obj in batch])
+                    report.skipped += len(existing)
+                    batch = [obj for obj in batch if object_uuid(obj) not in existing]
+                    if not batch:
+                        return
+                    result = await collection.data.insert_many([
+                        wvc.data.DataObject(properties=obj, uuid=object_uuid(obj)) for obj in batch
+                    ])
+                else:
+                    result = await collection.data.insert_many(batch)
+            except Exception as e:
+                logging.error(f"Error inserting batch of {len(batch)} objects, retrying them one by one: {e}")
+                self._adjust_batch_size(time.monotonic() - started_at, failed=True)
+                to_retry.extend(batch)
+                return
+            self._adjust_batch_size(time.monotonic() - started_at, failed=bool(result.errors))
+            report.inserted += len(batch) - len(result.errors)
+            to_retry.extend(batch[index] for index in result.errors)
+
+        position = 0
+
+        async def sender():
+            nonlocal position
+            while position < len(objects):
+                # The slot is held by the task sending the batch, so it is released even if the task is cancelled
+                async with self._in_flight:
+                    # Sized when a slot frees up, so it reflects the latest completed batches
+                    batch = objects[position:position + self.batch_size]
+                    position += len(batch)
+                    if batch:
+                        await send(batch)
+
+        await asyncio.gather(*(sender() for _ in range(min(self.max_in_flight, len(objects)))))
+
+        if to_retry:
+            report.retried = len(to_retry)
+            results = await asyncio.gather(*(
+                self._insert_one(collection, obj, object_uuid(obj) if object_uuid else None) for obj in to_retry
+            ))
+            for obj, (inserted, error) in zip(to_retry, results):
+                if error is not None:
+                    report.failed.append(FailedObject(key=key(obj), error=error))
+                elif inserted:
+                    report.inserted += 1
+                else:
+                    report.skipped += 1
+        return report
+
+    @staticmethod
+    async def _existing_uuids(collection, uuids: list[str]) -> set[str]:
+        result = await collection.query.fetch_objects(
+            limit=len(uuids),
+            filters=wvc.query.Filter.by_id().contains_any(uuids),
+            return_properties=[],
+        )
+        return {str(obj.uuid) for obj in result.objects}
+
+    async def _insert_one(self, collection, obj: dict[str, Any], uuid: Optional[str] = None):
+        """
+        Insert a single object with backoff. Returns whether it was inserted and the last error or None;
+        an object whose uuid already exists (e.g. a failed batch the server applied anyway) is not inserted.
+        """
+        error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+            async with self._in_flight:
+                try:
+                    if uuid is not None and await collection.data.exists(uuid):
+                        return False, None
+                    await collection.data.insert(properties=obj, uuid=uuid)
+                    return True, None
+                except Exception as e:
+                    error = str(e)
+        return False, error
@@ -0,0 +1,163 @@
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from utils.codec import codec_for
+
+
+class TailGroup(BaseModel):
+    """The open, not yet vectorized group at the end of a channel."""
+    channel_id: str
+    message_uuids: list[str] = []
+    tokens: int = 0
+    last_ts: Optional[datetime] = None
+    # Wall clock time the first member joined, the group is sealed once it gets too old
+    opened_at: Optional[float] = None
+    # Newest message ts seen by the grouper, only messages posted after it are fetched
+    cursor: Optional[datetime] = None
+
+    def is_open(self) -> bool:
+        return bool(self.message_uuids)
+
+
+class IncrementalGrouper:
+    """
+    Groups new messages of a channel without re-reading what was grouped before.
+    Messages are appended to the tail group of the channel in O(1); the tail is only
+    turned into a MessageGroup (and vectorized) once it is full, a time gap starts
+    a new one, or it has been open for seal_after_seconds. Threads are grouped on their own.
+    """
+    LOCK_TIMEOUT_SECONDS = 15 * 60
+
+    def __init__(self, vector_db_helper, redis_client, max_tokens: int = 200, max_days: int = 3,
+                 seal_after_seconds: float = 15 * 60, fetch_limit: int = 100) -> None:
+        self.vector_db_helper = vector_db_helper
+        self.redis_client = redis_client
+        self.max_tokens = max_tokens
+        self.max_days = max_days
+        self.seal_after_seconds = seal_after_seconds
+        self.fetch_limit = fetch_limit
+
+    def _key(self, channel_id: str) -> str:
+        return f"tail_group:channel_id:{channel_id}"
+
+    async def load(self, channel_id: str) -> TailGroup:
+        value = await self.redis_client.get(self._key(channel_id))
+        if value is not None:
+            try:
+                return codec_for(TailGroup).decode(value)
+            except Exception as e:
+                logging.error(f"Error decoding tail group of channel {channel_id}, starting over: {e}")
+        return TailGroup(channel_id=channel_id)
+
+    async def save(self, tail: TailGroup) -> None:
+        await self.redis_client.set(self._key(tail.channel_id), codec_for(TailGroup).encode(tail))
+
+    async def group_new_messages(self, channel_id: str) -> Optional[float]:
+        """
+        Append messages posted since the last call to the tail group.
+        Returns the seconds until the still open tail times out, None if there is no open tail.
+        """
+        async with self.redis_client.lock(f"{self._key(channel_id)}:lock", timeout=self.LOCK_TIMEOUT_SECONDS):
+            tail = await self.load(channel_id)
+            threads = set()
+            while True:
+                batch = await self.vector_db_helper.fetch_ungrouped_messages_after(
+                    channel_id, after_ts=tail.cursor, limit=self.fetch_limit)
+                for message_obj in batch:
+                    if self.vector_db_helper.is_thread(message_obj):
+                        threads.add(message_obj.properties['thread_ts'])
+                    else:
+                        await self._append(tail, message_obj)
+                    tail.cursor = message_obj.properties['ts']
+                # Saved after every page, so a failed pass doesn't append the same messages twice
+                await self.save(tail)
+                if len(batch) < self.fetch_limit:
+                    break
+
+            await self._regroup_threads(channel_id, threads)
+
+            if tail.is_open() and time.time() - tail.opened_at >= self.seal_after_seconds:
+                await self._seal(tail)
+                await self.save(tail)
+            return self._seal_in(tail)
+
+    def _seal_in(self, tail: TailGroup) -> Optional[float]:
+        if not tail.is_open():
+            return None
+        return max(0.0, tail.opened_at + self.seal_after_seconds - time.time())
+
+    async def open_tails(self) -> dict[str, float]:
+        """Seconds until the open tail group of each channel times out, read back from Redis e.g. after a restart."""
+        open_tails = {}
+        async for key in self.redis_client.scan_iter(match=self._key("*")):
+            key = key.decode('utf-8')
+            if key.endswith(":lock"):
+                continue
+            channel_id = key.rsplit(":", 1)[1]
+            seal_in = self._seal_in(await self.load(channel_id))
+            if seal_in is not None:
+                open_tails[channel_id] = seal_in
+        return open_tails
+
+    async def group_backlog(self, channel_id: str) -> None:
+        """
+        Group ungrouped messages that are older than the tail cursor, e.g. ingested from history
+        after newer messages were already grouped. Its last group is sealed too, so it must only run
+        once the backlog is complete, e.g. after the last page of a history sync.
+        """
+        async with self.redis_client.lock(f"{self._key(channel_id)}:lock", timeout=self.LOCK_TIMEOUT_SECONDS):
+            tail = await self.load(channel_id)
+            if tail.cursor is None:
+                return
+            in_tail = set(tail.message_uuids)
+            backlog = TailGroup(channel_id=channel_id)
+            threads = set()
+            after_ts = None
+            while True:
+                batch = await self.vector_db_helper.fetch_ungrouped_messages_after(
+                    channel_id, after_ts=after_ts, until_ts=tail.cursor, limit=self.fetch_limit)
+                for message_obj in batch:
+                    if self.vector_db_helper.is_thread(message_obj):
+                        threads.add(message_obj.properties['thread_ts'])
+                    elif str(message_obj.uuid) not in in_tail:
+                        await self._append(backlog, message_obj)
+                    after_ts = message_obj.properties['ts']
+                if len(batch) < self.fetch_limit:
+                    break
+            if backlog.is_open():
+                await self._seal(backlog)
+            await self._regroup_threads(channel_id, threads)
+
+    async def group_channel(self, channel_id: str, final: bool = True) -> Optional[float]:
+        """Group new messages, and with final the backlog as well."""
+        if final:
+            await self.group_backlog(channel_id)
+        return await self.group_new_messages(channel_id)
+
+    async def _append(self, tail: TailGroup, message_obj) -> None:
+        message = message_obj.properties
+        message_tokens = self.vector_db_helper.tokenize(message['text'])
+        ts = message['ts']
+        if tail.is_open() and (tail.tokens + message_tokens > self.max_tokens
+                               or (ts - tail.last_ts).days > self.max_days):
+            await self._seal(tail)
+        if not tail.is_open():
+            tail.opened_at = time.time()
+        tail.message_uuids.append(str(message_obj.uuid))
+        tail.tokens += message_tokens
+        tail.last_ts = ts
+
+    async def _seal(self, tail: TailGroup) -> None:
+        members = await self.vector_db_helper.fetch_ungrouped_messages_by_ids(tail.message_uuids)
+        if members:
+            logging.info(f"Sealing group of {len(members)} messages in channel {tail.channel_id}")
+            await self.vector_db_helper.create_message_group_with_messages(members)
+        tail.message_uuids, tail.tokens, tail.last_ts, tail.opened_at = [], 0, None, None
+
+    async def _regroup_threads(self, channel_id: str, threads: set) -> None:
+        if threads:
+            await self.vector_db_helper.regroup_threads(channel_id, sorted(threads))
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from utils.process_stats import ProcessStatsPublisher
+
+
+class RegroupScheduler:
+    """
+    Coalesces grouping requests per channel. The first trigger schedules a grouping job after
+    a debounce window; triggers arriving while the job waits are absorbed into it, triggers
+    arriving while it runs cause exactly one more run. At most one job runs per channel.
+    While a channel has an open tail group, a run is scheduled for when the tail times out.
+    Stats are published to Redis, so the API can report them for all Slack processes.
+    """
+    STATS_KEY = "regroup_scheduler:stats"
+    PUBLISH_INTERVAL_SECONDS = 15
+
+    def __init__(self, incremental_grouper, redis_client, debounce_seconds: float = 5.0) -> None:
+        self.incremental_grouper = incremental_grouper
+        self.stats_publisher = ProcessStatsPublisher(redis_client, self.STATS_KEY, self.PUBLISH_INTERVAL_SECONDS)
+        self.debounce_seconds = debounce_seconds
+        self._jobs: dict[str, asyncio.Task] = {}
+        self._seal_timers: dict[str, asyncio.TimerHandle] = {}
+        self._waiting: set[str] = set()
+        self._rerun: set[str] = set()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _channel_stats(self, channel_id: str) -> dict[str, int]:
+        return self._stats.setdefault(channel_id, {"triggers": 0, "absorbed": 0, "runs": 0, "errors": 0})
+
+    def trigger(self, channel_id: str) -> None:
+        stats = self._channel_stats(channel_id)
+        stats["triggers"] += 1
+        job = self._jobs.get(channel_id)
+        if job is None or job.done():
+            self._jobs[channel_id] = asyncio.create_task(self._run(channel_id))
+        elif channel_id in self._waiting or channel_id in self._rerun:
+            stats["absorbed"] += 1
+        else:
+            self._rerun.add(channel_id)
+
+    async def _run(self, channel_id: str) -> None:
+        stats = self._channel_stats(channel_id)
+        try:
+            while True:
+                self._waiting.add(channel_id)
+                await asyncio.sleep(self.debounce_seconds)
+                self._waiting.discard(channel_id)
+                self._rerun.discard(channel_id)
+                logging.info(f"Regrouping channel {channel_id}, {stats['absorbed']} triggers absorbed so far")
+                try:
+                    seal_in = await self.incremental_grouper.group_new_messages(channel_id)
+                    self.schedule_seal(channel_id, seal_in)
+                except Exception as e:
+                    stats["errors"] += 1
+                    logging.error(f"Error regrouping channel {channel_id}: {e}")
+                stats["runs"] += 1
+                if channel_id not in self._rerun:
+                    break
+        finally:
+            self._waiting.discard(channel_id)
+            self._jobs.pop(channel_id, None)
+
+    def schedule_seal(self, channel_id: str, seal_in: Optional[float]) -> None:
+        """Run grouping once the open tail of a channel times out, seal_in None cancels the timer."""
+        timer = self._seal_timers.pop(channel_id, None)
+        if timer is not None:
+            timer.cancel()
+        if seal_in is not None:
+            # The debounce window is waited out again by the triggered run
+            delay = max(0.0, seal_in - self.debounce_seconds)
+            self._seal_timers[channel_id] = asyncio.get_running_loop().call_later(delay, self.trigger, channel_id)
+
+    async def rearm_seal_timers(self, owns: Callable[[str], bool] = lambda channel_id: True) -> None:
+        """Timers live in memory, at startup they are armed again for open tails of the channels this process owns."""
+        for channel_id, seal_in in (await self.incremental_grouper.open_tails()).items():
+            if owns(channel_id):
+                self.schedule_seal(channel_id, seal_in)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "triggers": sum(s["triggers"] for s in self._stats.values()),
+            "absorbed": sum(s["absorbed"] for s in self._stats.values()),
+            "runs": sum(s["runs"] for s in self._stats.values()),
+            "channels": {channel_id: dict(s) for channel_id, s in self._stats.items()},
+        }
+
+    def _collect(self) -> Optional[dict[str, Any]]:
+        return self.get_stats() if self._stats else None
+
+    async def publish(self) -> None:
+        stats = self._collect()
+        if stats is not None:
+            await self.stats_publisher.publish(stats)
+
+    async def run_publisher(self) -> None:
+        await self.stats_publisher.run(self._collect)
+
+    async def get_report(self) -> dict[str, Any]:
+        """Stats merged over processes that published recently."""
+        report = {"processes": 0, "triggers": 0, "absorbed": 0, "runs": 0, "errors": 0, "channels": {}}
+        for stats in await self.stats_publisher.read_all():
+            report["processes"] += 1
+            for channel_id, channel_stats in stats["channels"].items():
+                merged = report["channels"].setdefault(channel_id, {"triggers": 0, "absorbed": 0, "runs": 0, "errors": 0})
+                for counter, value in channel_stats.items():
+                    merged[counter] += value
+                    report[counter] += value
+        return report
@@ -1,13 +1,16 @@
+import asyncio
 import logging
 import re
 from typing import Any
 import dateutil.relativedelta
 from langchain_core.retrievers import BaseRetriever
 import weaviate.classes as wvc
+from weaviate.util import generate_uuid5
 import uuid
 from datetime import datetime, timezone
-import math
 from utils.date_utils import ts_to_rfc3339
+from vectordb.batch_inserter import AdaptiveBatchInserter, BatchInsertReport
+from vectordb.weaviate_connection_manager import WeaviateConnectionManager
 
 logger = logging.getLogger(__name__)
 
@@ -27,16 +30,18 @@ class CustomWeaviateRetriever(BaseRetriever):
 
 class VectorDBHelper:
 
-    def __init__(self, client):
-        self.client = client
+    def __init__(self, connection_manager: WeaviateConnectionManager, batch_inserter: AdaptiveBatchInserter):
+        self.connection_manager = connection_manager
+        self.batch_inserter = batch_inserter
         self.parent_chunk_max_days = 30  # Max days a conversation can span in a parent chunk
         self.parent_chunk_max_size = 10  # Max number of child chunks in a parent
+        self.update_concurrency = 16  # Concurrent single-object updates, Weaviate has no batch update
 
     def as_retriever(self):
-        return CustomWeaviateRetriever(self.client)
+        return CustomWeaviateRetriever(self.connection_manager.client)
 
     async def fetch_ungrouped_messages(self, channel_id, limit=100):
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             messages = self.get_messages_collection(c)
             result = await messages.query.fetch_objects(
                 limit=limit,
@@ -48,22 +53,76 @@ class VectorDBHelper:
         return [msg for msg in result.objects if
                 not msg.properties.get('thread_ts') or self.is_thread_starter(msg)]
 
-    async def fetch_entire_thread(self, thread_ts, channel_id):
-        async with self.client as c:
+    async def fetch_ungrouped_messages_after(self, channel_id, after_ts=None, until_ts=None, limit=100):
+        """Ungrouped messages, thread messages included, posted after after_ts and up to until_ts."""
+        filters = wvc.query.Filter.by_property("channel_id").equal(channel_id) & wvc.query.Filter.by_ref_count(
+            link_on="hasMessageGroup").equal(0) & wvc.query.Filter.by_property("ref_count").equal(0)
+        if after_ts is not None:
+            filters = filters & wvc.query.Filter.by_property("ts").greater_than(after_ts)
+        if until_ts is not None:
+            filters = filters & wvc.query.Filter.by_property("ts").less_or_equal(until_ts)
+        async with self.connection_manager.connection() as c:
+            messages = self.get_messages_collection(c)
+            result = await messages.query.fetch_objects(
+                limit=limit,
+                filters=filters,
+                sort=wvc.query.Sort.by_property("ts", ascending=True),
+            )
+        return result.objects
+
+    async def fetch_ungrouped_messages_by_ids(self, message_uuids):
+        if not message_uuids:
+            return []
+        async with self.connection_manager.connection() as c:
             messages = self.get_messages_collection(c)
             result = await messages.query.fetch_objects(
-                filters=wvc.query.Filter.by_property('channel_id').equal(channel_id)
-                        & wvc.query.Filter.by_property('thread_ts').equal(thread_ts),
-                sort=wvc.query.Sort.by_property("ts", ascending=True)
+                limit=len(message_uuids),
+                filters=wvc.query.Filter.by_id().contains_any(message_uuids)
+                        & wvc.query.Filter.by_property("ref_count").equal(0),
+                sort=wvc.query.Sort.by_property("ts", ascending=True),
             )
         return result.objects
 
+    async def fetch_entire_thread(self, thread_ts, channel_id):
+        threads = await self.fetch_entire_threads([thread_ts], channel_id)
+        return threads[thread_ts]
+
+    async def fetch_entire_threads(self, thread_ts_list, channel_id, return_references=False, page_size=1000):
+        """
+        Messages of several threads with one filtered query instead of a query per thread.
+        Returns them partitioned by thread_ts, each thread sorted by ts.
+        """
+        threads = {thread_ts: [] for thread_ts in thread_ts_list}
+        if not threads:
+            return threads
+        filters = wvc.query.Filter.by_property('channel_id').equal(channel_id) & wvc.query.Filter.any_of([
+            wvc.query.Filter.by_property('thread_ts').equal(thread_ts) for thread_ts in threads
+        ])
+        async with self.connection_manager.connection() as c:
+            messages = self.get_messages_collection(c)
+            offset = 0
+            while True:
+                result = await messages.query.fetch_objects(
+                    limit=page_size,
+                    offset=offset,
+                    filters=filters,
+                    sort=wvc.query.Sort.by_property("ts", ascending=True),
+                    return_references=wvc.query.QueryReference(
+                        link_on="hasMessageGroup") if return_references else None,
+                )
+                for message_obj in result.objects:
+                    threads.setdefault(message_obj.properties['thread_ts'], []).append(message_obj)
+                if len(result.objects) < page_size:
+                    break
+                offset += page_size
+        return threads
+
     async def fetch_messages_last_3_months(self, search_text, top_k, channel_id):
         three_months_ago = datetime.now(timezone.utc) - dateutil.relativedelta.relativedelta(months=30)
         # Convert to RFC 3339 format with timezone information
         three_months_ago_iso = three_months_ago.isoformat()
 
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             messages = self.get_messages_collection(c)
             result = await messages.query.near_text(
                 query=search_text,
@@ -79,11 +138,16 @@ class VectorDBHelper:
         """
         Delete a class from the Weaviate schema if it exists.
         """
-        async with self.client as client:
+        async with self.connection_manager.connection() as client:
             await client.collections.delete(class_name)
         logging.info(f"Deleted existing class '{class_name}' from schema.")
 
-    async def add_messages(self, cleaned_messages, channel_id):
+    @staticmethod
+    def message_uuid(message):
+        """Same uuid for the same Slack message, so history syncs and live events never insert it twice."""
+        return generate_uuid5(f"{message['channel_id']}:{message['ts']}")
+
+    async def add_messages(self, cleaned_messages, channel_id) -> BatchInsertReport:
         to_insert = list()
         for message in cleaned_messages:
             rfc_3339_timestamp = ts_to_rfc3339(message['ts'])
@@ -94,26 +158,17 @@ class VectorDBHelper:
             message['ref_count'] = 0
             to_insert.append(message)
 
-        def split_into_chunks(data, chunk_size):
-            """Split the data into chunks of specified size."""
-            for i in range(0, len(data), chunk_size):
-                yield data[i:i + chunk_size]
-
-        bulk_insert_size = 10  # Define the size of each chunk
-        total_chunks = math.ceil(len(to_insert) / bulk_insert_size)
-
-        async with self.client as c:
-            messages = self.get_messages_collection(c)
-
-            for i, chunk in enumerate(split_into_chunks(to_insert, bulk_insert_size), start=1):
-                try:
-                    await messages.data.insert_many(chunk)
-                    logging.info(f"Successfully inserted chunk {i}/{total_chunks}")
-                except Exception as e:
-                    logging.info(f"Error inserting chunk {i}/{total_chunks}: {e}")
+        async with self.connection_manager.connection() as c:
+            report = await self.batch_inserter.insert(self.get_messages_collection(c), to_insert,
+                                                      object_uuid=self.message_uuid)
+        logging.info(f"Inserted {report.inserted}/{len(to_insert)} messages into channel {channel_id}"
+                     f" ({report.skipped} already stored, {report.retried} retried one by one)")
+        for failed in report.failed:
+            logging.error(f"Message {failed.key} of channel {channel_id} could not be inserted: {failed.error}")
+        return report
 
     async def create_schema(self):
-        async with self.client as client:
+        async with self.connection_manager.connection() as client:
             # Create the "MessageGroup" class with a reference to "Message"
             await client.collections.create(
                 name="MessageGroup",
@@ -184,39 +239,57 @@ class VectorDBHelper:
                 current_tokens += message_tokens
 
             last_ts = current_ts
+        if current_group:
+            formed_groups.append(current_group)
         return formed_groups
 
     async def ungroup(self, message_objs, client):
+        return await self._ungroup_objects(message_objs.objects, client)
+
+    async def _ungroup_objects(self, message_objs, client):
         unbound_message_group_ids = []
-        obj_count = len(message_objs.objects)
+        obj_count = len(message_objs)
         if 0 == obj_count:
             logging.debug("No messages to unbound, exiting")
             return unbound_message_group_ids
 
         logging.debug(f"Found {obj_count} messages to be unbound from message group.")
-        for message_obj in message_objs.objects:
+        messages = self.get_messages_collection(client)
+        operations = []
+        for message_obj in message_objs:
             if not message_obj.references:
                 continue
-            for ref in message_obj.references['hasMessageGroup'].objects:
-                group_uuid = ref.uuid
-                messages = self.get_messages_collection(client)
-                message_uuid = message_obj.uuid
-                await messages.data.update(
-                    uuid=message_uuid,
-                    properties={
-                        "ref_count": 0,
-                    }
-                )
-                await messages.data.reference_delete(
-                    from_uuid=message_uuid,
-                    from_property='hasMessageGroup',
-                    to=group_uuid
-                )
-                unbound_message_group_ids.append(group_uuid)
+            group_uuids = [ref.uuid for ref in message_obj.references['hasMessageGroup'].objects]
+            if not group_uuids:
+                continue
+            operations.append(self._unbind_message(messages, message_obj.uuid, group_uuids))
+            unbound_message_group_ids.extend(group_uuids)
+        # There is no batch endpoint for reference deletes and property updates, messages are unbound concurrently
+        await self._gather_bounded(operations)
         return unbound_message_group_ids
 
+    @staticmethod
+    async def _unbind_message(messages, message_uuid, group_uuids):
+        # In sequence: a reference delete reads the object and writes it back, it would undo a concurrent update
+        await messages.data.update(uuid=message_uuid, properties={"ref_count": 0})
+        for group_uuid in group_uuids:
+            await messages.data.reference_delete(
+                from_uuid=message_uuid,
+                from_property='hasMessageGroup',
+                to=group_uuid
+            )
+
+    async def _gather_bounded(self, coroutines):
+        semaphore = asyncio.Semaphore(self.update_concurrency)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(bounded(coroutine) for coroutine in coroutines))
+
     async def ungroup_all(self):
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             await self._ungroup_all(c)
 
     async def _ungroup_all(self, client):
@@ -252,7 +325,7 @@ class VectorDBHelper:
             # Assuming all messages in a group share the same channel_id
         }
 
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             message_groups = self.get_message_groups_collection(c)
 
             message_group_uuid = uuid.uuid4()
@@ -261,22 +334,24 @@ class VectorDBHelper:
                 uuid=message_group_uuid
             )
 
-            # Update each Message with a reference to the newly created MessageGroup
-            for message in message_group_object:
-                message_uuid = message.uuid
-                messages = self.get_messages_collection(c)
-                await messages.data.reference_add(
+            # Reference every Message to the newly created MessageGroup in one batch request
+            messages = self.get_messages_collection(c)
+            result = await messages.data.reference_add_many([
+                wvc.data.DataReference(
                     from_property="hasMessageGroup",
-                    from_uuid=message_uuid,
-                    to=message_group_uuid
-                )
-
-                await messages.data.update(
-                    uuid=message_uuid,
-                    properties={
-                        "ref_count": 1,
-                    }
+                    from_uuid=message.uuid,
+                    to_uuid=message_group_uuid
                 )
+                for message in message_group_object
+            ])
+            if result.has_errors:
+                logging.error(f"Failed to reference {len(result.errors)} messages to group {message_group_uuid}: "
+                              f"{list(result.errors.values())[:3]}")
+            # Messages whose reference failed stay ungrouped (ref_count 0) and are picked up again later
+            await self._gather_bounded(
+                messages.data.update(uuid=message.uuid, properties={"ref_count": 1})
+                for index, message in enumerate(message_group_object) if index not in result.errors
+            )
 
     def msg_array_to_text(self, message_group_object, include_dates=False, is_db_object=True):
         def props(msg):
@@ -306,7 +381,7 @@ class VectorDBHelper:
         return " \n ".join(messages)
 
     async def get_relevant_message_groups(self, channel_id, query, distance=0.5, limit=3):
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             message_groups = self.get_message_groups_collection(c)
             response = await message_groups.query.near_text(
                 query=query,
@@ -319,7 +394,7 @@ class VectorDBHelper:
 
     async def get_last_x_messages(self, channel_id, limit=5):
         # TODO fetches also thread messages if these are recent. Not sure what is correct behavior here.
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             messages = self.get_messages_collection(c)
             fetched_messages = await messages.query.fetch_objects(
                 limit=limit,
@@ -338,7 +413,7 @@ class VectorDBHelper:
         return client.collections.get("Message")
 
     async def delete_message_groups(self):
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             await self.get_message_groups_collection(c).data.delete_many(
                 where=wvc.query.Filter.by_property("text").like("*")
             )
@@ -360,22 +435,20 @@ class VectorDBHelper:
                 break
             else:
                 logger.info(f"Fetched {len(ungrouped_messages)} ungrouped messages.")
-            for message_obj in ungrouped_messages:
-                # Check if the message is a thread starter
-                if self.is_thread_starter(message_obj):
-                    # Fetch the entire thread excluding the starter as it's already fetched
-                    thread_messages = await self.fetch_entire_thread(message_obj.properties['thread_ts'], channel_id)
-
-                    # Immediately create a MessageGroup for the thread
-                    if thread_messages:  # Ensure the thread_messages is not empty
-                        logger.info(
-                            f"Creating MessageGroup for thread {message_obj.properties['thread_ts']} with {len(thread_messages)} messages.")
-                        await self.create_message_group_with_messages(thread_messages)
-                    continue
+            starters = [message_obj for message_obj in ungrouped_messages if self.is_thread_starter(message_obj)]
+            plain_messages = [message_obj for message_obj in ungrouped_messages if not self.is_thread_starter(message_obj)]
+            # Expand every thread of the batch, starters included, with a single query
+            threads = await self.fetch_entire_threads(
+                [message_obj.properties['thread_ts'] for message_obj in starters], channel_id)
+            for thread_ts, thread_messages in threads.items():
+                # Immediately create a MessageGroup for the thread
+                if thread_messages:  # Ensure the thread_messages is not empty
+                    logger.info(f"Creating MessageGroup for thread {thread_ts} with {len(thread_messages)} messages.")
+                    await self.create_message_group_with_messages(thread_messages)
             logger.info("Grouping messages...")
-            grouped_messages = self._group_messages(ungrouped_messages)
+            grouped_messages = self._group_messages(plain_messages)
 
-            if not grouped_messages:
+            if len(plain_messages) == len(ungrouped_messages) and not grouped_messages:
                 logger.info("No messages were grouped. Exiting process.")
                 break
 
@@ -396,8 +469,23 @@ class VectorDBHelper:
         return message_obj.properties.get('thread_ts') == message_obj.properties.get('ts')
 
 
+    async def regroup_threads(self, channel_id, thread_ts_list):
+        """Replace the groups of threads with one group per thread of all of its current messages."""
+        threads = await self.fetch_entire_threads(thread_ts_list, channel_id, return_references=True)
+        async with self.connection_manager.connection() as c:
+            group_uuids_to_delete = await self._ungroup_objects(
+                [message_obj for thread_messages in threads.values() for message_obj in thread_messages], c)
+            if group_uuids_to_delete:
+                await self.get_message_groups_collection(c).data.delete_many(
+                    where=wvc.query.Filter.by_id().contains_any(group_uuids_to_delete)
+                )
+        for thread_ts, thread_messages in threads.items():
+            if thread_messages:
+                logger.info(f"Creating MessageGroup for thread {thread_ts} with {len(thread_messages)} messages.")
+                await self.create_message_group_with_messages(thread_messages)
+
     async def delete_message_group_by_thread_ts(self, mes):
-        async with self.client as c:
+        async with self.connection_manager.connection() as c:
             messages = self.get_messages_collection(c)
             thread_starter_ts = mes.get('thread_ts')
             thread_starter = await messages.query.fetch_objects(
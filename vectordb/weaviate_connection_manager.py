@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from weaviate.exceptions import WeaviateClosedClientError, WeaviateConnectionError, WeaviateGRPCUnavailableError
+
+# Errors after which the connection can't be trusted anymore
+CONNECTION_ERRORS = (WeaviateClosedClientError, WeaviateConnectionError, WeaviateGRPCUnavailableError)
+
+
+class WeaviateConnectionManager:
+    """
+    Owns the async Weaviate client of a process: connects it once on first use, shares the open
+    connection between coroutines, reconnects after a connection failure and closes it at shutdown.
+    """
+
+    def __init__(self, client) -> None:
+        self.client = client
+        self._lock = asyncio.Lock()
+        self._broken = False
+
+    async def get_client(self):
+        if self._broken or not self.client.is_connected():
+            async with self._lock:
+                # Another coroutine may have reconnected while we waited
+                if self._broken or not self.client.is_connected():
+                    await self._reconnect()
+        return self.client
+
+    async def _reconnect(self) -> None:
+        if self.client.is_connected():
+            logging.info("Reconnecting to Weaviate")
+            try:
+                await self.client.close()
+            except Exception as e:
+                logging.debug(f"Error closing broken Weaviate connection: {e}")
+        await self.client.connect()
+        self._broken = False
+
+    @asynccontextmanager
+    async def connection(self):
+        """Open client for a unit of work; a connection error makes the next caller reconnect."""
+        client = await self.get_client()
+        try:
+            yield client
+        except CONNECTION_ERRORS as e:
+            logging.error(f"Weaviate connection failed, will reconnect: {e}")
+            self._broken = True
+            raise
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self.client.is_connected():
+                await self.client.close()
@@ -1,3 +1,5 @@
+import asyncio
+
 from icecream import ic
 from transitions.extensions import HierarchicalMachine as Machine
 import json
@@ -14,7 +16,6 @@ class SlackHSM:
         self.name = name
         self.redis_client = redis_client
         self.state = 'initialized'  # Default initial state
-        self.load_state()
 
         states = ['initialized',
                   {'name': 'channel-info-received', 'children': [
@@ -63,6 +64,12 @@ class SlackHSM:
         self.machine.add_transition('receive_team_response', 'waiting_for_team_answer', 'team_response_issue_covered')
         self.machine.add_transition('confirm_issue', 'waiting_for_confirmation', 'confirmation_received', after='action_completed')
 
+    @classmethod
+    async def load(cls, name, redis_client) -> "SlackHSM":
+        slack_hsm = cls(name, redis_client)
+        await slack_hsm.load_state()
+        return slack_hsm
+
     def is_customer_message(self, message):
         return message['type'] == 'customer'
 
@@ -75,17 +82,17 @@ class SlackHSM:
     def action_completed(self):
         logging.info(f"Action completed successfully for state: {self.state}")
 
-    def on_enter(self, state):
+    async def on_enter(self, state):
         logging.info(f"Entering state: {state}")
-        self.save_state()
+        await self.save_state()
 
-    def save_state(self):
+    async def save_state(self):
         state_data = json.dumps(self.state)
-        self.redis_client.set(f'state:{self.name}', state_data)
+        await self.redis_client.set(f'state:{self.name}', state_data)
         logging.info(f"State saved: {self.state}")
 
-    def load_state(self):
-        state_data = self.redis_client.get(f'state:{self.name}')
+    async def load_state(self):
+        state_data = await self.redis_client.get(f'state:{self.name}')
         if state_data:
             self.state = json.loads(state_data)
             logging.info(f"State loaded: {self.state}")
@@ -95,9 +102,12 @@ class SlackHSM:
 
 
 # Example usage
-if __name__ == "__main__":
+async def main():
     container = Container()
-    redis_client = container.redis_client()
-    slack_hsm = SlackHSM("example_hsm", redis_client)
+    slack_hsm = await SlackHSM.load("example_hsm", container.redis_client())
     slack_hsm.machine.message_received({"content": "Hello World"})
-    ic(slack_hsm.machine)
\ No newline at end of file
+    ic(slack_hsm.machine)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -1,5 +1,3 @@
-import json
-
 from celery import Celery
 from typing import Callable
 
@@ -7,6 +5,7 @@ from llm.llm_caller import LLMCaller
 from slack.struct.event_data import EventData
 from slack.struct.message_history_data import MessageHistoryData
 from slack.slack_meta_info import SlackMetaInfo
+from utils.codec import codec_for
 from workflows.channel_state_manager import ChannelState, ChannelStateManager
 
 
@@ -32,9 +31,9 @@ class SlackStateManager:
         self.channel_state_manager_factory = channel_state_manager_factory
 
     async def load_channel_data(self, channel_id: str) -> ChannelState:
-        channel_data = self.redis.get(channel_id)
+        channel_data = await self.redis.get(channel_id)
         if channel_data:
-            channel_data = json.loads(channel_data)
+            return codec_for(ChannelState).decode(channel_data)
         else:
             members = await self.slack_meta_info_provider.get_channel_members_all(channel_id)
             missing_roles_message = f"User roles are missing in channel {channel_id}."
@@ -49,13 +48,13 @@ class SlackStateManager:
             channel_data = {
                 "channel_id": channel_id,
                 "users": members,
-                "workspace_name": self.slack_meta_info_provider.get_workspace_name(),
+                "workspace_name": await self.slack_meta_info_provider.get_workspace_name(),
             }
         # Use Pydantic's parsing to handle defaults and type enforcement
         return ChannelState.model_validate(channel_data)
 
-    def save_channel_data(self, channel_state: ChannelState) -> None:
-        self.redis.set(channel_state.channel_id, channel_state.json())
+    async def save_channel_data(self, channel_state: ChannelState) -> None:
+        await self.redis.set(channel_state.channel_id, codec_for(ChannelState).encode(channel_state))
 
     async def handle_message(
         self,
@@ -68,4 +67,4 @@ class SlackStateManager:
             channel_state=channel_state
         )
         channel_manager.handle_message(message_history_data, event_data)
-        self.save_channel_data(channel_state)
+        await self.save_channel_data(channel_state)